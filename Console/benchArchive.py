@@ -0,0 +1,49 @@
+from argparse import ArgumentParser
+import time
+import sys
+import os
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Compare the .cal tree with the columnar calibration archive")
+
+    parser.add_argument("-l", "--local", type=str, dest='local', default="cal",
+                        help='local calibration directory')
+    parser.add_argument("-a", "--archive", type=str, dest='archive', default="archive",
+                        help='calibration archive directory (filled from the local dir if needed)')
+    parser.add_argument("-n", "--ndays", type=int, dest='ndays', default=10,
+                        help='number of calibration days to compare')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore import ConsoleReport, getDateFromDir
+    from stkcore.calReader import getCalDirList, buildCalDict, readCalBlock, ingestCalArchive
+    from stkcore.calArchive import getArchiveDayPath, readArchiveDay
+
+    local_folders = getCalDirList(opts.local)[:opts.ndays]
+    if not len(local_folders):
+        print(f"No calibration found in local dir: [{opts.local}]")
+        return
+    ingestCalArchive(local_folders, opts.archive, ConsoleReport())
+    archive_days = [getArchiveDayPath(opts.archive, getDateFromDir(cal_folder)) for cal_folder in local_folders]
+
+    csv_files = [f"{cal_folder}/{cal}" for cal_folder in local_folders for cal in os.listdir(cal_folder) if cal.endswith('.cal')]
+    csv_bytes = sum(os.path.getsize(cal_file) for cal_file in csv_files)
+    archive_bytes = sum(os.path.getsize(day_path) for day_path in archive_days)
+
+    start = time.perf_counter()
+    for cal_folder in local_folders:
+        readCalBlock(buildCalDict(cal_folder))
+    csv_time = (time.perf_counter() - start)/len(local_folders)
+    start = time.perf_counter()
+    for day_path in archive_days:
+        readArchiveDay(day_path)
+    archive_time = (time.perf_counter() - start)/len(archive_days)
+
+    print(f"{len(local_folders)} calibration days compared")
+    print(f"size:      .cal tree {csv_bytes/1e6:.1f} MB in {len(csv_files)} files, archive {archive_bytes/1e6:.1f} MB in {len(archive_days)} files (ratio {csv_bytes/archive_bytes:.1f})")
+    print(f"load time: .cal tree {csv_time*1e3:.1f} ms/day, archive {archive_time*1e3:.1f} ms/day (ratio {csv_time/archive_time:.1f})")
+
+if __name__ == '__main__':
+    main()
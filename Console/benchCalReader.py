@@ -0,0 +1,50 @@
+from argparse import ArgumentParser
+import time
+import sys
+
+
+def legacyReadCalDict(file_cal_dict: dict) -> list:
+    import pandas as pd
+    ladder_means = []
+    for trb_value in file_cal_dict:
+        for ladder_value in file_cal_dict[trb_value]:
+            df = pd.read_csv(file_cal_dict[trb_value][ladder_value], header=None)
+            df.columns=["ch", "va", "chva", "ped", "sigma_raw", "sigma", "status", "status_2", "status_3"]
+            df = df.drop(list(range(383, 386)))
+            ladder_means.append((df['sigma'].mean(), df['sigma_raw'].mean(), df['ped'].mean()))
+            ladder_means[-1] += (len(df.query('sigma<5')), len(df.query('sigma>=5 & sigma<=10')), len(df.query('sigma>10')))
+    return ladder_means
+
+def timeReader(reader, cal_dicts: list) -> float:
+    start = time.perf_counter()
+    for cal_dict in cal_dicts:
+        reader(cal_dict)
+    return (time.perf_counter() - start)/len(cal_dicts)
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Benchmark calibration day parsing")
+
+    parser.add_argument("-l", "--local", type=str, dest='local', default="cal",
+                        help='local calibration directory')
+    parser.add_argument("-n", "--ndays", type=int, dest='ndays', default=10,
+                        help='number of calibration days to parse')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore.calReader import getCalDirList, buildCalDict, readCalDict
+
+    cal_dicts = [buildCalDict(cal_folder) for cal_folder in getCalDirList(opts.local)[:opts.ndays]]
+    if not len(cal_dicts):
+        print(f"No calibration found in local dir: [{opts.local}]")
+        return
+
+    legacy_time = timeReader(legacyReadCalDict, cal_dicts)
+    block_time = timeReader(readCalDict, cal_dicts)
+    print(f"{len(cal_dicts)} calibration days parsed")
+    print(f"per-ladder pandas reader: {legacy_time*1e3:.1f} ms/day")
+    print(f"batched block reader:     {block_time*1e3:.1f} ms/day")
+    print(f"speedup:                  {legacy_time/block_time:.1f}x")
+
+if __name__ == '__main__':
+    main()
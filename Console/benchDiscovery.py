@@ -0,0 +1,63 @@
+from argparse import ArgumentParser
+from datetime import date, timedelta
+import tempfile
+import time
+import sys
+import os
+
+
+def buildFakeRemoteTree(fake_root: str, cal_path: str, start_date: date, ndays: int, nladders: int = 192, cal_payload: bytes = b"", raw_payload: bytes = b""):
+    for day_idx in range(ndays):
+        day_dir = f"{fake_root}{cal_path}/{(start_date + timedelta(days=day_idx)).strftime('%Y%m%d')}"
+        # Every third day starts with an incomplete calibration, as happens on the real farm
+        raw_dirs = ["STK_CALIB_RAW_0", "STK_CALIB_RAW_1"] if day_idx % 3 == 0 else ["STK_CALIB_RAW_0"]
+        for raw_idx, raw_dir in enumerate(raw_dirs):
+            os.makedirs(f"{day_dir}/{raw_dir}")
+            ncals = nladders//2 if raw_idx < len(raw_dirs)-1 else nladders
+            for ladder_idx in range(ncals):
+                with open(f"{day_dir}/{raw_dir}/TRB0{ladder_idx//24}_ladder{ladder_idx:03d}.cal", "wb") as _cal:
+                    _cal.write(cal_payload)
+            # Raw calibration data next to the .cal files, never read by the analysis
+            if len(raw_payload):
+                with open(f"{day_dir}/{raw_dir}/STK_CALIB_RAW.frd", "wb") as _raw:
+                    _raw.write(raw_payload)
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Benchmark XRootD calibration discovery against a local fake xrdfs")
+
+    parser.add_argument("-n", "--ndays", type=int, dest='ndays', default=60,
+                        help='number of fake calibration days')
+    parser.add_argument("-j", "--jobs", type=int, dest='jobs', default=8,
+                        help='number of concurrent xrdfs listings')
+    parser.add_argument("--latency", type=float, dest='latency', default=0.05,
+                        help='simulated xrdfs round-trip latency (s)')
+    parser.add_argument("-t", "--transport", type=str, dest='transport', default="cli", choices=['cli', 'local'],
+                        help='fake xrdfs processes, or the in-process local filesystem transport')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore import ConsoleReport, parseXrootDfiles
+
+    with tempfile.TemporaryDirectory() as fake_root:
+        config = {'farmAddress': "root://localhost//", 'cal_XRDFS_path': "/FM/FlightData/CAL/STK", 'start_date': date(2016, 1, 1), 'end_date': date(2016, 1, 1) + timedelta(days=opts.ndays-1), 'transport': opts.transport, 'local_root': fake_root}
+        buildFakeRemoteTree(fake_root, config['cal_XRDFS_path'], config['start_date'], opts.ndays)
+        os.environ['PATH'] = f"{os.path.abspath('fakexrd')}{os.pathsep}{os.environ['PATH']}"
+        os.environ['FAKE_XRD_ROOT'] = fake_root
+        os.environ['FAKE_XRD_LATENCY'] = str(opts.latency)
+
+        timings = {}
+        file_dicts = {}
+        for jobs in [1, opts.jobs]:
+            start = time.perf_counter()
+            # A fresh local dir per run, so that no remote manifest is reused
+            file_dicts[jobs] = parseXrootDfiles(dict(config, xrdfs_jobs=jobs), tempfile.mkdtemp(dir=fake_root), ConsoleReport())
+            timings[jobs] = time.perf_counter() - start
+
+    print(f"{len(file_dicts[1])} calibration days discovered")
+    for jobs in timings:
+        print(f"xrdfs_jobs = {jobs:3d}: {timings[jobs]:.2f} s")
+    print(f"same mapping: {file_dicts[1] == file_dicts[opts.jobs]}")
+
+if __name__ == '__main__':
+    main()
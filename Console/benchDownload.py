@@ -0,0 +1,63 @@
+from argparse import ArgumentParser
+from datetime import date, timedelta
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+# A valid calibration file: 384 channel rows and the trailer
+cal_payload = "".join(f"{ch},{ch//64},{ch % 64},221.000,11.400,3.000,0,0,0\n" for ch in range(384)).encode() + b"0,0,0\n"*3
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Exercise the calibration download engine against a local fake xrdcp")
+
+    parser.add_argument("-n", "--ndays", type=int, dest='ndays', default=30,
+                        help='number of fake calibration days')
+    parser.add_argument("-j", "--jobs", type=int, dest='jobs', default=4,
+                        help='number of concurrent xrdcp transfers')
+    parser.add_argument("--latency", type=float, dest='latency', default=0.05,
+                        help='simulated xrdcp latency (s)')
+    parser.add_argument("--fail-rate", type=float, dest='fail_rate', default=0.1,
+                        help='probability of a simulated xrdcp failure')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore import ConsoleReport, parseXrootDfiles, downloadFiles, checkDownloadedFiles
+    from benchDiscovery import buildFakeRemoteTree
+
+    with tempfile.TemporaryDirectory() as fake_root:
+        config = {'farmAddress': "root://localhost//", 'cal_XRDFS_path': "/FM/FlightData/CAL/STK", 'start_date': date(2016, 1, 1), 'end_date': date(2016, 1, 1) + timedelta(days=opts.ndays-1), 'xrdfs_jobs': 8, 'xrdcp_jobs': opts.jobs, 'xrdcp_retries': 5, 'xrdcp_backoff': 0.1, 'transport': "cli"}
+        buildFakeRemoteTree(f"{fake_root}/remote", config['cal_XRDFS_path'], config['start_date'], opts.ndays, cal_payload=cal_payload, raw_payload=os.urandom(20000000))
+        os.environ['PATH'] = f"{os.path.abspath('fakexrd')}{os.pathsep}{os.environ['PATH']}"
+        os.environ['FAKE_XRD_ROOT'] = f"{fake_root}/remote"
+        os.environ['FAKE_XRD_LATENCY'] = str(opts.latency)
+        os.environ['FAKE_XRD_FAIL_RATE'] = str(opts.fail_rate)
+
+        local_dir = f"{fake_root}/cal"
+        os.mkdir(local_dir)
+        file_dict = parseXrootDfiles(config, local_dir, ConsoleReport())
+        start = time.perf_counter()
+        status = downloadFiles(file_dict, local_dir, config, ConsoleReport())
+        print(f"first pass: {time.perf_counter()-start:.2f} s, complete: {status and checkDownloadedFiles(local_dir, ConsoleReport())}")
+
+        # A second pass only has to fetch the days that failed, or nothing at all
+        start = time.perf_counter()
+        status = downloadFiles(file_dict, local_dir, config, ConsoleReport())
+        print(f"resumed pass: {time.perf_counter()-start:.2f} s, complete: {status and checkDownloadedFiles(local_dir, ConsoleReport())}")
+
+        # The first day is re-published under a new RAW folder, with a single ladder changed: only that file is downloaded again
+        first_day = f"{fake_root}/remote{file_dict[config['start_date']]}"
+        shutil.move(first_day, f"{first_day[:-1]}9")
+        with open(f"{first_day[:-1]}9/TRB00_ladder000.cal", "wb") as _cal:
+            _cal.write(cal_payload.replace(b"221.000", b"222.000", 1))
+        os.environ['FAKE_XRD_FAIL_RATE'] = "0"
+        file_dict = parseXrootDfiles(dict(config, recheck_days=opts.ndays), local_dir, ConsoleReport())
+        start = time.perf_counter()
+        status = downloadFiles(file_dict, local_dir, config, ConsoleReport())
+        print(f"re-published pass: {time.perf_counter()-start:.2f} s, complete: {status and checkDownloadedFiles(local_dir, ConsoleReport())}")
+
+if __name__ == '__main__':
+    main()
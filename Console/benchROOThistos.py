@@ -0,0 +1,88 @@
+from argparse import ArgumentParser
+from datetime import date, timedelta
+import numpy as np
+import time
+import sys
+
+
+def buildFakeEvolution(ndays: int, nladders: int = 192, nchannels: int = 384) -> dict:
+    rng = np.random.default_rng(0)
+    dates = [date(2016, 1, 1) + timedelta(days=day_idx) for day_idx in range(ndays)]
+    return {
+        'date': dates,
+        'sigma_values': [list(rng.normal(3, 0.3, nladders)) for _ in dates],
+        'sigma_raw_values': [list(rng.normal(11.5, 0.5, nladders)) for _ in dates],
+        'pedestal_values': [list(rng.normal(250, 40, nladders)) for _ in dates],
+        'cn_values': [list(rng.normal(11, 0.7, nladders)) for _ in dates],
+        # Channel sigmas with the 3 decimals of the .cal files, in float32 as read from the channel cube
+        'chsigmas': [np.round(rng.gamma(9, 0.35, (nladders, nchannels)), 3).astype(np.float32) for _ in dates]
+    }
+
+def buildHistos(time_evolution: dict, tag: str) -> list:
+    from ROOT import TH1D, TH2D, TProfile, TDatime
+    start_time = TDatime(time_evolution['date'][0].year, time_evolution['date'][0].month, time_evolution['date'][0].day, 12, 0, 0).Convert()
+    end_time = TDatime(time_evolution['date'][-1].year, time_evolution['date'][-1].month, time_evolution['date'][-1].day, 12, 0, 0).Convert()
+    bins = int((end_time-start_time)/86400)
+    histos = [TH2D(f"sigma_evolution_{tag}", "", bins, start_time, end_time, 100, 2, 4), TProfile(f"sigma_evolution_profile_{tag}", "", bins, start_time, end_time, 2, 4)]
+    histos += [TH1D(f"hsigmach_{tag}_{day_idx}", "", 1000, 0, 100) for day_idx in range(len(time_evolution['date']))]
+    return histos
+
+def legacyFill(time_evolution: dict, histos: list):
+    from ROOT import TDatime
+    for idx, ladder_values in enumerate(time_evolution['sigma_values']):
+        for single_value in ladder_values:
+            tmpdate = TDatime(time_evolution['date'][idx].year, time_evolution['date'][idx].month, time_evolution['date'][idx].day, 12, 0, 0).Convert()
+            histos[0].Fill(tmpdate, single_value)
+            histos[1].Fill(tmpdate, single_value)
+    for idx, chsigma in enumerate(time_evolution['chsigmas']):
+        # The values as parsed from the .cal files
+        for ladder in np.round(chsigma.astype(np.float64), 3):
+            for channel_noise_adc in ladder:
+                histos[2+idx].Fill(channel_noise_adc)
+
+def batchFill(time_evolution: dict, histos: list):
+    from buildSTKplots import getDayTimes, fillTimeEvolution, fillHisto
+    day_times = getDayTimes(time_evolution['date'])
+    fillTimeEvolution(histos[0], histos[1], day_times, time_evolution['sigma_values'])
+    for idx, chsigma in enumerate(time_evolution['chsigmas']):
+        fillHisto(histos[2+idx], np.ravel(chsigma))
+
+def getHistoState(histo) -> tuple:
+    from ROOT import TProfile
+    stats = np.zeros(13)
+    histo.GetStats(stats)
+    contents = np.array([histo.GetBinContent(bin_idx) for bin_idx in range(histo.GetNcells())])
+    errors = np.array([histo.GetBinError(bin_idx) for bin_idx in range(histo.GetNcells())])
+    state = (contents.tobytes(), errors.tobytes(), stats.tobytes(), histo.GetEntries())
+    if isinstance(histo, TProfile):
+        state += (np.array([histo.GetBinEntries(bin_idx) for bin_idx in range(histo.GetNcells())]).tobytes(),)
+    return state
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Benchmark ROOT histogram filling in buildROOThistos")
+
+    parser.add_argument("-n", "--ndays", type=int, dest='ndays', default=30,
+                        help='number of fake calibration days')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    sys.path.append("moduls")
+    time_evolution = buildFakeEvolution(opts.ndays)
+
+    timings = {}
+    histos = {}
+    for tag, filler in [('legacy', legacyFill), ('batch', batchFill)]:
+        histos[tag] = buildHistos(time_evolution, tag)
+        start = time.perf_counter()
+        filler(time_evolution, histos[tag])
+        timings[tag] = time.perf_counter() - start
+
+    print(f"{opts.ndays} calibration days filled")
+    print(f"per-value Fill: {timings['legacy']:.2f} s")
+    print(f"batched FillN:  {timings['batch']:.2f} s")
+    print(f"speedup:        {timings['legacy']/timings['batch']:.1f}x")
+    print(f"bit-compatible: {all(getHistoState(legacy) == getHistoState(batch) for legacy, batch in zip(histos['legacy'], histos['batch']))}")
+
+if __name__ == '__main__':
+    main()
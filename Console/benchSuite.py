@@ -0,0 +1,189 @@
+from argparse import ArgumentParser
+from datetime import date, datetime, timedelta
+import numpy as np
+import subprocess
+import platform
+import resource
+import tempfile
+import shutil
+import json
+import time
+import sys
+import os
+
+nladders = 192
+nchannels = 384
+trailer_rows = "0,0,0\n0,0,0\n0,0,0\n"
+evolution_figures = {"sigma": "firebrick", "sigma_raw": "darkorange", "pedestal": "forestgreen", "cn": "mediumturquoise", "chfrac_s5": "cornflowerblue", "chfrac_s510": "sandybrown", "chfrac_s10": "firebrick"}
+
+
+def buildSyntheticCalDay(day_dir: str, rng: np.random.Generator, noisy_channels: int = 4) -> int:
+    # 192 ladders x 384 channels (ch, va, chva, ped, sigma_raw, sigma, status x3), plus the 3 trailer rows
+    os.makedirs(day_dir, exist_ok=True)
+    channels = np.arange(nchannels)
+    nbytes = 0
+    for ladder_idx in range(nladders):
+        ped = rng.normal(221, 20, nchannels)
+        sigma = rng.normal(3, 0.2, nchannels)
+        sigma_raw = np.sqrt(sigma**2 + rng.normal(11, 0.3, nchannels)**2)
+        # Noisy channels, spread across the 5-10 and > 10 ADC bands
+        noisy = rng.choice(nchannels, noisy_channels, replace=False)
+        sigma[noisy] = rng.uniform(5, 15, noisy_channels)
+        status = (sigma > 5).astype(int)
+        rows = np.column_stack((channels, channels//64, channels % 64, ped, sigma_raw, sigma, status, status, status))
+        cal_text = "".join("%d,%d,%d,%.3f,%.3f,%.3f,%d,%d,%d\n" % tuple(row) for row in rows) + trailer_rows
+        with open(f"{day_dir}/TRB0{ladder_idx//24}_ladder{ladder_idx:03d}.cal", "w") as _cal:
+            nbytes += _cal.write(cal_text)
+    return nbytes
+
+def buildSyntheticCalTree(cal_dir: str, start_date: date, ndays: int, noisy_channels: int = 4, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    day_dirs = []
+    for day_idx in range(ndays):
+        day_dir = f"{cal_dir}/{(start_date + timedelta(days=day_idx)).strftime('%Y%m%d')}"
+        # Days left complete by a previous run are reused
+        if not os.path.isdir(day_dir) or len([cal for cal in os.listdir(day_dir) if cal.endswith('.cal')]) != nladders:
+            buildSyntheticCalDay(day_dir, rng, noisy_channels)
+        day_dirs.append(day_dir)
+    return day_dirs
+
+def buildFakeRemoteMirror(fake_root: str, cal_path: str, day_dirs: list):
+    # The remote RAW folder of each day points at the synthetic local day
+    for day_dir in day_dirs:
+        remote_day_dir = f"{fake_root}{cal_path}/{os.path.basename(day_dir)}"
+        os.makedirs(remote_day_dir, exist_ok=True)
+        if not os.path.islink(f"{remote_day_dir}/STK_CALIB_RAW_0"):
+            os.symlink(os.path.abspath(day_dir), f"{remote_day_dir}/STK_CALIB_RAW_0")
+
+def resetPeakRSS():
+    # Linux only: restart the VmHWM high-water mark, so that each stage gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as _refs:
+            _refs.write("5")
+    except OSError:
+        pass
+
+def getPeakRSS() -> int:
+    try:
+        with open("/proc/self/status", "r") as _status:
+            for line in _status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+def getGitCommit() -> str:
+    try:
+        return subprocess.run("git rev-parse --short HEAD", shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode('utf-8').strip()
+    except subprocess.CalledProcessError:
+        return ""
+
+def timeStage(results: list, ndays: int, stage: str, run, nfiles: int = 0, nbytes: int = 0):
+    resetPeakRSS()
+    start = time.perf_counter()
+    value = run()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    result = {'ndays': ndays, 'stage': stage, 'seconds': round(elapsed, 4), 'days_per_s': round(ndays/elapsed, 2), 'peak_rss_mb': round(getPeakRSS()/1e6, 1)}
+    if nfiles:
+        result['files_per_s'] = round(nfiles/elapsed, 1)
+    if nbytes:
+        result['mb_per_s'] = round(nbytes/1e6/elapsed, 2)
+    results.append(result)
+    print(f"{ndays:5d} days  {stage:15s} {elapsed:9.2f} s  {result['days_per_s']:9.1f} days/s  {result['peak_rss_mb']:8.1f} MB peak RSS")
+    return value
+
+def buildFigures(time_evolution: dict, xinterval: int):
+    # The figures of the Console output, straight from stkcore.figures: the stage does not need PyROOT
+    from stkcore import buildEvFigure, buildChSigmaEv
+    import matplotlib.pyplot as plt
+    for variable, color in evolution_figures.items():
+        buildEvFigure(time_evolution, plt_variable=variable, plt_variable_label=variable, plt_color=color, xaxis_interval=xinterval, yaxis_title=variable).savefig(f"{variable}_evolution.pdf")
+    buildChSigmaEv(time_evolution, xaxis_interval=xinterval, fractions=['chfrac_s510', 'chfrac_s10'], legend=True).savefig("channel_noise_evolution.pdf")
+    plt.close('all')
+
+def runScale(ndays: int, work_dir: str, opts) -> list:
+    sys.path.append("..")
+    sys.path.append("moduls")
+    from stkcore import ConsoleReport, parseXrootDfiles, iterCalDays, buildTimeEvolution
+    from stkcore.summaryCache import getCacheDir
+    from stkcore.channelCube import getCubeDir
+
+    results = []
+    start_date = date(2016, 1, 1)
+    cal_dir = f"{work_dir}/cal_{ndays}"
+    day_dirs = buildSyntheticCalTree(cal_dir, start_date, ndays, opts.noisy, opts.seed)
+    nfiles = ndays*nladders
+    nbytes = sum(os.path.getsize(f"{day_dir}/{cal}") for day_dir in day_dirs for cal in os.listdir(day_dir))
+    report = ConsoleReport()
+    report.progress = lambda iterable, total: iterable
+
+    fake_root = f"{work_dir}/remote_{ndays}"
+    config = {'farmAddress': "root://localhost//", 'cal_XRDFS_path': "/FM/FlightData/CAL/STK", 'start_date': start_date, 'end_date': start_date + timedelta(days=ndays-1), 'xrdfs_jobs': opts.xrdfs_jobs, 'transport': "cli"}
+    buildFakeRemoteMirror(fake_root, config['cal_XRDFS_path'], day_dirs)
+    os.environ['PATH'] = f"{os.path.abspath('fakexrd')}{os.pathsep}{os.environ['PATH']}"
+    os.environ['FAKE_XRD_ROOT'] = fake_root
+    os.environ['FAKE_XRD_LATENCY'] = "0"
+    timeStage(results, ndays, "discovery", lambda: parseXrootDfiles(config, tempfile.mkdtemp(dir=work_dir), report))
+
+    timeStage(results, ndays, "parse", lambda: sum(1 for _ in iterCalDays(day_dirs, opts.jobs)), nfiles, nbytes)
+
+    shutil.rmtree(getCacheDir(cal_dir), ignore_errors=True)
+    shutil.rmtree(getCubeDir(cal_dir), ignore_errors=True)
+    timeStage(results, ndays, "aggregate_cold", lambda: buildTimeEvolution(cal_dir, day_dirs, report, opts.jobs), nfiles, nbytes)
+    time_evolution = timeStage(results, ndays, "aggregate_warm", lambda: buildTimeEvolution(cal_dir, day_dirs, report, opts.jobs))
+
+    output_dir = tempfile.mkdtemp(dir=work_dir)
+    cwd = os.getcwd()
+    os.chdir(output_dir)
+    try:
+        timeStage(results, ndays, "matplotlib", lambda: buildFigures(time_evolution, xinterval=6))
+        try:
+            from buildSTKplots import buildROOThistos
+        except ImportError as error:
+            # ROOT is optional for the benchmarks: only its export is skipped
+            print(f"{ndays:5d} days  root_export skipped: {error}")
+        else:
+            timeStage(results, ndays, "root_export", lambda: buildROOThistos(time_evolution, out_filename="ladder_time_info.root"))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Time each analysis stage on synthetic calibration trees")
+
+    parser.add_argument("-s", "--scales", type=str, dest='scales', default="30,365,2000",
+                        help='comma-separated numbers of calibration days')
+    parser.add_argument("-w", "--workdir", type=str, dest='workdir',
+                        help='keep the synthetic trees in this directory, and reuse them on the next run')
+    parser.add_argument("-j", "--jobs", type=int, dest='jobs', default=1,
+                        help='number of parallel calibration parsing processes')
+    parser.add_argument("--xrdfs-jobs", type=int, dest='xrdfs_jobs', default=8,
+                        help='number of concurrent xrdfs listings')
+    parser.add_argument("--noisy", type=int, dest='noisy', default=4,
+                        help='noisy channels injected per ladder')
+    parser.add_argument("--seed", type=int, dest='seed', default=0,
+                        help='random seed of the synthetic calibrations')
+    parser.add_argument("-o", "--output", type=str, dest='output', default="bench_results.jsonl",
+                        help='JSON lines file the run is appended to')
+    opts = parser.parse_args(args)
+
+    work_dir = opts.workdir if opts.workdir else tempfile.mkdtemp()
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        for ndays in [int(scale) for scale in opts.scales.split(',')]:
+            results += runScale(ndays, os.path.abspath(work_dir), opts)
+    finally:
+        if not opts.workdir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    run = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': getGitCommit(), 'host': platform.node(), 'python': platform.python_version(), 'cpus': os.cpu_count(), 'jobs': opts.jobs, 'noisy': opts.noisy, 'seed': opts.seed, 'results': results}
+    with open(opts.output, "a") as _output:
+        _output.write(f"{json.dumps(run)}\n")
+    print(f"Results appended to: [{opts.output}]")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from argparse import ArgumentParser
+from datetime import datetime
+import sys
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Query the channel noise band and status flag transitions indexed while parsing calibrations")
+
+    parser.add_argument("-l", "--local", type=str, dest='local', default="cal",
+                        help='calibration directory, or archive, already parsed by getSTKstatus.py')
+    parser.add_argument("-s", "--start", type=str, dest='start',
+                        help='first transition date (YYYYMMDD)')
+    parser.add_argument("-e", "--end", type=str, dest='end',
+                        help='last transition date (YYYYMMDD)')
+    parser.add_argument("-L", "--ladder", type=int, dest='ladder', action='append',
+                        help='ladder index (0-191), can be repeated; all ladders if not set')
+    parser.add_argument("-b", "--bands-only", dest='bands_only', default=False,
+                        action='store_true', help='only list noise band changes, not status flag ones')
+    parser.add_argument("-n", "--noisy", type=int, dest='noisy', choices=[5, 10],
+                        help='list the channels with sigma above 5 or 10 ADC on the end date (last day by default), and since when')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore import queryTransitions, getNoisyChannels
+
+    start_date = datetime.strptime(opts.start, '%Y%m%d').date() if opts.start else None
+    end_date = datetime.strptime(opts.end, '%Y%m%d').date() if opts.end else None
+    if opts.noisy:
+        channels = getNoisyChannels(opts.local, end_date, min_band=1 if opts.noisy == 5 else 2, ladders=opts.ladder)
+    else:
+        channels = queryTransitions(opts.local, start_date, end_date, opts.ladder, opts.bands_only)
+    if not len(channels):
+        print(f"No channel transition found in: [{opts.local}]")
+        return
+    print(channels.to_string(index=False))
+
+if __name__ == '__main__':
+    main()
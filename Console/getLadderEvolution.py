@@ -0,0 +1,64 @@
+from argparse import ArgumentParser
+from datetime import datetime
+import sys
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Plot the time evolution of a TRB or ladder subset from the summary cache")
+
+    parser.add_argument("-l", "--local", type=str, dest='local', default="cal",
+                        help='local calibration directory')
+    parser.add_argument("-a", "--archive", type=str, dest='archive',
+                        help='read the calibrations from a columnar archive directory')
+    parser.add_argument("-m", "--metric", type=str, dest='metric', default="sigma",
+                        choices=['sigma', 'sigma_raw', 'pedestal', 'cn', 'chfrac_s5', 'chfrac_s510', 'chfrac_s10'], help='per-ladder metric')
+    parser.add_argument("-t", "--trb", type=int, dest='trb', action='append',
+                        help='TRB index (0-7), can be repeated; all TRBs if not set')
+    parser.add_argument("-L", "--ladder", type=int, dest='ladder', action='append',
+                        help='ladder index within the TRB (0-23), can be repeated; all ladders if not set')
+    parser.add_argument("-g", "--group", type=str, dest='group', default="trb", choices=['trb', 'ladder', 'all'],
+                        help='one curve per TRB, per ladder, or for the whole selection')
+    parser.add_argument("-s", "--start", type=str, dest='start',
+                        help='first calibration date (YYYYMMDD)')
+    parser.add_argument("-e", "--end", type=str, dest='end',
+                        help='last calibration date (YYYYMMDD)')
+    parser.add_argument("-x", "--xinterval", type=int, dest='xinterval', default=6,
+                        help='X axis interval in months')
+    parser.add_argument("-o", "--output", type=str, dest='output',
+                        help='output PDF (default: <metric>_ladder_evolution.pdf)')
+    parser.add_argument("--csv", type=str, dest='csv',
+                        help='also write the selected per-day values to a CSV file')
+    parser.add_argument("-j", "--jobs", type=int, dest='jobs', default=1,
+                        help='number of parallel calibration parsing processes, for days missing from the summary cache')
+    parser.add_argument("-v", "--verbose", dest='verbose', default=False,
+                        action='store_true', help='run in high verbosity mode')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore import ConsoleReport, getCalDirList, getArchiveDays, purgeDirs, buildTimeEvolution, getLadderArray, buildLadderEvFigure
+    import pandas as pd
+
+    local_cal_dir = opts.archive if opts.archive else opts.local
+    local_folders = getArchiveDays(local_cal_dir) if opts.archive else getCalDirList(local_cal_dir)
+    if opts.start or opts.end:
+        local_folders = purgeDirs(local_folders, datetime.strptime(opts.start if opts.start else "20000101", '%Y%m%d').date(), datetime.strptime(opts.end if opts.end else "29991231", '%Y%m%d').date())
+    if not len(local_folders):
+        print('No calibration found matching the selected time window... select a different time interval')
+        return
+
+    # Days already in the summary cache are not parsed again
+    time_evolution = buildTimeEvolution(local_cal_dir, local_folders, ConsoleReport(opts.verbose), opts.jobs, ladder_values=False)
+    output = opts.output if opts.output else f"{opts.metric}_ladder_evolution.pdf"
+    buildLadderEvFigure(time_evolution, opts.metric, opts.xinterval, opts.trb, opts.ladder, opts.group).savefig(output, bbox_inches='tight')
+    print(f"Figure saved: [{output}]")
+    if opts.csv:
+        values = getLadderArray(time_evolution, opts.metric, opts.trb, opts.ladder)
+        trbs = opts.trb if opts.trb else range(values.shape[1])
+        ladders = opts.ladder if opts.ladder else range(values.shape[2])
+        columns = [f"TRB0{trb}_ladder{ladder:02d}" for trb in trbs for ladder in ladders]
+        pd.DataFrame(values.reshape(len(values), -1), index=pd.Index(time_evolution['date'], name='date'), columns=columns).to_csv(opts.csv)
+        print(f"Values saved: [{opts.csv}]")
+
+if __name__ == '__main__':
+    main()
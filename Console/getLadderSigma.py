@@ -0,0 +1,38 @@
+from argparse import ArgumentParser
+from datetime import datetime
+import sys
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Build channel sigma histograms from a ladder_time_info.root sigma tree")
+
+    parser.add_argument("-i", "--input", type=str, dest='input', default="ladder_time_info.root",
+                        help='ROOT file written with getSTKstatus.py --sigma-tree')
+    parser.add_argument("-d", "--date", type=str, dest='date', required=True,
+                        help='calibration date (YYYYMMDD)')
+    parser.add_argument("-l", "--ladder", type=int, dest='ladder', action='append',
+                        help='ladder index (0-191), can be repeated; whole tracker if not set')
+    parser.add_argument("-o", "--output", type=str, dest='output', default="ladder_sigma.root",
+                        help='output ROOT file')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    sys.path.append("moduls")
+    from ROOT import TFile
+    from buildSTKplots import buildLadderSigmaHisto
+
+    cal_date = datetime.strptime(opts.date, '%Y%m%d').date()
+    histos = [buildLadderSigmaHisto(opts.input, cal_date, ladder_idx) for ladder_idx in (opts.ladder if opts.ladder else [-1])]
+    if not all(histos):
+        return
+    outfile = TFile(opts.output, "RECREATE")
+    if not outfile.IsOpen():
+        print(f"Error writing output TFile: [{opts.output}]")
+        return
+    for histo in histos:
+        histo.Write()
+    outfile.Close()
+
+if __name__ == '__main__':
+    main()
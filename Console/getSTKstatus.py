@@ -10,24 +10,40 @@ def main(args=None):
                         help='use local calibration directory')
     parser.add_argument("-u", "--update", dest='update', default=False,
                         action='store_true', help='update local folder')
+    parser.add_argument("-a", "--archive", type=str, dest='archive',
+                        help='ingest calibrations into, and read them from, a columnar archive directory')
+    parser.add_argument("-j", "--jobs", type=int, dest='jobs', default=1,
+                        help='number of parallel calibration parsing processes')
+    parser.add_argument("-s", "--sigma-tree", dest='sigma_tree', default=False,
+                        action='store_true', help='store channel sigmas as a per-day TTree instead of per-ladder histograms')
+    parser.add_argument("-t", "--timings", type=str, dest='timings', nargs='?', const="stk_timings.jsonl", default=None,
+                        help='append the stage and subprocess timings to a JSON lines file (default: stk_timings.jsonl)')
+    parser.add_argument("--profile", type=str, dest='profile', nargs='?', const="profile", default="",
+                        help='dump cProfile statistics of the parse and ROOT stages into a directory (default: profile)')
     parser.add_argument("-v", "--verbose", dest='verbose', default=False,
                         action='store_true', help='run in high verbosity mode')
     opts = parser.parse_args(args)
 
     # Load analysis functions
+    sys.path.append("..")
     sys.path.append("moduls")
+    from stkcore import ConsoleReport, StageTimings
     from configParser import parseConfigFile
     from downloadCal import getCalFiles
     from buildSTKplots import buildStkPlots
 
     # Get dictionary from config file parsing
     pars = parseConfigFile()
+    opts.report = ConsoleReport(opts.verbose, StageTimings(opts.timings, opts.profile))
     status = True
-    if not opts.local:
+    if not opts.local and not opts.archive:
         # Download cal files
         status = getCalFiles(pars, opts)
     if status:
         buildStkPlots(opts, pars)
+    opts.report.timings.close()
+    for total in opts.report.timings.summary():
+        opts.report.debug(f"{total['kind']:10s} {total['name']:15s} {total['calls']:6d} calls {total['seconds']:9.2f} s {total['days']:6d} days {total['files']:8d} files {total['bytes']/1e6:9.1f} MB {total['retries']:4d} retries")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,59 @@
+from argparse import ArgumentParser
+import sys
+
+
+def main(args=None):
+    parser = ArgumentParser(
+        usage="Usage: %(prog)s [options]", description="Compare the calibrations of several time windows, read in a single pass")
+
+    parser.add_argument("-l", "--local", type=str, dest='local', default="cal",
+                        help='local calibration directory')
+    parser.add_argument("-a", "--archive", type=str, dest='archive',
+                        help='read the calibrations from a columnar archive directory')
+    parser.add_argument("-w", "--window", type=str, dest='window', action='append', default=[],
+                        help='time window, can be repeated: [label=]YYYYMMDD:YYYYMMDD (either end can be left open, ":" for the full mission) or [label=]lastN for the last N days')
+    parser.add_argument("-g", "--group", type=str, dest='group', default="", choices=['weekly', 'monthly', 'yearly'],
+                        help='also add one window per calendar week, month or year')
+    parser.add_argument("-m", "--metric", type=str, dest='metric', action='append',
+                        choices=['sigma', 'sigma_raw', 'pedestal', 'cn', 'chfrac_s5', 'chfrac_s510', 'chfrac_s10'], help='variable to plot, can be repeated (default: sigma)')
+    parser.add_argument("-b", "--bins", type=int, dest='bins', default=100,
+                        help='number of bins of the distributions')
+    parser.add_argument("--csv", type=str, dest='csv',
+                        help='also write the per-window summary to a CSV file')
+    parser.add_argument("-j", "--jobs", type=int, dest='jobs', default=1,
+                        help='number of parallel calibration parsing processes, for days missing from the summary cache')
+    parser.add_argument("-v", "--verbose", dest='verbose', default=False,
+                        action='store_true', help='run in high verbosity mode')
+    opts = parser.parse_args(args)
+
+    sys.path.append("..")
+    from stkcore import ConsoleReport, getCalDirList, getArchiveDays, getWindows, buildWindowEvolution, summarizeWindows, buildWindowDistribution, buildWindowSummaryFigure
+    import pandas as pd
+
+    if not len(opts.window) and not opts.group:
+        print("Select at least one window (-w) or calendar grouping (-g)")
+        return
+    local_cal_dir = opts.archive if opts.archive else opts.local
+    local_folders = getArchiveDays(local_cal_dir) if opts.archive else getCalDirList(local_cal_dir)
+    if not len(local_folders):
+        print(f"No calibration found in: [{local_cal_dir}]")
+        return
+
+    try:
+        windows = getWindows(local_folders, opts.window, opts.group)
+    except ValueError as error:
+        parser.error(str(error))
+    window_evolutions = buildWindowEvolution(local_cal_dir, local_folders, windows, ConsoleReport(opts.verbose), opts.jobs)
+    summary = summarizeWindows(window_evolutions, windows)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(summary[['window', 'start', 'end', 'days'] + [f"{metric}_mean" for metric in (opts.metric if opts.metric else ['sigma'])]].to_string(index=False))
+    for metric in (opts.metric if opts.metric else ['sigma']):
+        buildWindowSummaryFigure(summary, metric).savefig(f"{metric}_windows.pdf", bbox_inches='tight')
+        buildWindowDistribution(window_evolutions, metric, opts.bins).savefig(f"{metric}_window_distribution.pdf", bbox_inches='tight')
+        print(f"Figures saved: [{metric}_windows.pdf] [{metric}_window_distribution.pdf]")
+    if opts.csv:
+        summary.to_csv(opts.csv, index=False)
+        print(f"Summary saved: [{opts.csv}]")
+
+if __name__ == '__main__':
+    main()
@@ -1,131 +1,22 @@
-from datetime import date, timedelta
-from tqdm import tqdm
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+from datetime import date
 from matplotlib import rcParams
-from ROOT import TFile, TH1D, TH2D, TProfile, TDatime, TCanvas, gStyle, gROOT, gPad
+from ROOT import TFile, TH1D, TH2D, TProfile, TTree, TDatime, TCanvas, gStyle, gROOT, gPad
+import numpy as np
 import argparse
-import os
-from downloadCal import updateCalFiles, getDateFromDir
-
-
-
-def buildTRBfileList(local_cal_dir: str) -> list:
-    trbfiles = []
-    files = [file for file in os.listdir(local_cal_dir) if file.endswith('.cal')]
-    for trb in [f"TRB0{trb_idx}" for trb_idx in range(8)]:
-        trbfiles.append([f"{local_cal_dir}/{ladder_cal}" for ladder_cal in files if ladder_cal.startswith(trb)])
-        trbfiles[-1].sort()
-    return trbfiles
-
-def buildCalDict(local_cal_dir: str) -> dict:
-    trbfiles = buildTRBfileList(local_cal_dir)
-    trbs = [f"TRB0{trb_idx}" for trb_idx in range(8)]
-    trb_dicts = [dict(zip(range(len(trbfiles[0])), tmptrbfiles)) for tmptrbfiles in trbfiles]
-    return dict(zip(trbs, trb_dicts))
-
-def readCalDict(file_cal_dict: dict) -> tuple:
-    all_sigma_values = []
-    trbs_sigma_mean = []
-    trbs_rawsigma_mean = []
-    trbs_ped_mean = []
-    trbs_cn_mean = []
-    ch5_tot = []
-    ch5_10_tot = []
-    ch10_tot = []
-    for trb_value in file_cal_dict:
-        tmp_sigma_mean = []
-        tmp_sigmaraw_mean = []
-        tmp_ped_mean = []
-        tmp_cn_mean = []
-        ch5 = []
-        ch5_10 = []
-        ch10 = []
-        for ladder_value in file_cal_dict[trb_value]:
-            df = pd.read_csv(file_cal_dict[trb_value][ladder_value], header=None)
-            df.columns=["ch", "va", "chva", "ped", "sigma_raw", "sigma", "status", "status_2", "status_3"]
-            df = df.drop(list(range(383, 386)))
-            all_sigma_values.append(list(df['sigma']))
-            tmp_sigma_mean.append(df['sigma'].mean())
-            tmp_sigmaraw_mean.append(df['sigma_raw'].mean())
-            tmp_ped_mean.append(df['ped'].mean())
-            tmp_cn_mean.append(np.sqrt(pow(tmp_sigmaraw_mean[-1], 2) - pow(tmp_sigma_mean[-1], 2)))
-            ch5.append(len(df.query('sigma<5')))
-            ch5_10.append(len(df.query('sigma>=5 & sigma<=10')))
-            ch10.append(len(df.query('sigma>10')))
-        trbs_sigma_mean.append(tmp_sigma_mean)
-        trbs_rawsigma_mean.append(tmp_sigmaraw_mean)
-        trbs_ped_mean.append(tmp_ped_mean)
-        trbs_cn_mean.append(tmp_cn_mean)
-        ch5_tot.append(ch5)
-        ch5_10_tot.append(ch5_10)
-        ch10_tot.append(ch10)
-    trbs = [f"TRB0{trb_idx}" for trb_idx in range(8)]
-    dict_sigma_mean = [dict(zip(range(len(trbs_sigma_mean[0])), sigmas)) for sigmas in trbs_sigma_mean]
-    dict_sigmaraw_mean = [dict(zip(range(len(trbs_rawsigma_mean[0])), sigmas)) for sigmas in trbs_rawsigma_mean]
-    dict_ped_mean = [dict(zip(range(len(trbs_ped_mean[0])), sigmas)) for sigmas in trbs_ped_mean]
-    dict_cn_mean = [dict(zip(range(len(trbs_cn_mean[0])), sigmas)) for sigmas in trbs_cn_mean]
-    dict_ch5 = [dict(zip(range(len(trbs_cn_mean[0])), ch)) for ch in ch5_tot]
-    dict_ch5_10 = [dict(zip(range(len(trbs_cn_mean[0])), ch)) for ch in ch5_10_tot]
-    dict_ch10 = [dict(zip(range(len(trbs_cn_mean[0])), ch)) for ch in ch10_tot]
-    return (dict(zip(trbs, dict_sigma_mean)), dict(zip(trbs, dict_sigmaraw_mean)), dict(zip(trbs, dict_ped_mean)), dict(zip(trbs, dict_cn_mean)), dict(zip(trbs, dict_ch5)), dict(zip(trbs, dict_ch5_10)), dict(zip(trbs, dict_ch10))), all_sigma_values
-
-def getMeanValue(valdict: dict) -> float:
-    trb_meanvalues = []
-    for trb_value in valdict:
-        trb_meanvalues.append(np.array(list(valdict[trb_value].values())).mean())
-    return np.array(trb_meanvalues).mean()
-
-def getValues(valdict: dict) -> list:
-    ladder_values = []
-    for trb_value in valdict:
-        ladder_values += list(valdict[trb_value].values())
-    return ladder_values
-
-def getChannelFraction(valdict: dict) -> float:
-    ch_ladder = 384
-    ch_selected = 0
-    for trb_value in valdict:
-        for ch_tmp_ladder in valdict[trb_value]:
-            ch_selected += valdict[trb_value][ch_tmp_ladder]
-    return ch_selected/(ch_ladder*len(valdict)*len(valdict['TRB00']))
-
-def purgeDirs(filelist: list, config:list) -> list:
-    purged_filelist = []
-    for cal_dir in filelist:
-        tmpdate = getDateFromDir(cal_dir)
-        if tmpdate >= config['start_date'] and tmpdate <= config['end_date']:
-            purged_filelist.append(cal_dir)
-    return purged_filelist
+from stkcore import getCalDirList, getCalSourceDate, getArchiveDays, ingestCalArchive, purgeDirs, iterTimeEvolution, buildTimeEvolution, initEvolutionSeries, fillEvolutionSeries, initDriftMonitor, fillDriftMonitor, finalizeDriftMonitor, buildEvFigure, buildChSigmaEv
+from stkcore.calReader import nchannels
+from stkcore.driftMonitor import getDriftDir
+from downloadCal import updateCalFiles
+
 
 def updateLocalDirs(local_cal_dir: str, local_folders: list, opts: argparse.Namespace, config: dict) -> bool:
     if opts.verbose:
         print("updating local directory calibration files...")
-    config['start_date'] = getDateFromDir(local_folders[-1]) + timedelta(days=1)
-    return updateCalFiles(config, opts)
-
-def getCalDirList(local_cal_dir: str) -> list:
-    local_folders = [f"{local_cal_dir}/{folder}" for folder in os.listdir(local_cal_dir) if folder.startswith('20')]
-    local_folders.sort()
-    return local_folders
-
-def parseCalLocalDirs(local_cal_dir: str, opts: argparse.Namespace, config: dict) -> dict:
-    caldate = []
-    sigma = []
-    sigma_values = []
-    sigma_raw = []
-    sigma_raw_values = []
-    ped = []
-    ped_values = []
-    cn = []
-    cn_values = []
-    chfrac_s5 = []
-    chfrac_s510 = []
-    chfrac_s10 = []
-    chsigmas = []
+    # The remote manifest limits probing to new, late-arriving or replaced calibrations
+    config['start_date'] = getCalSourceDate(local_folders[0])
+    return updateCalFiles(config, opts, local_cal_dir)
 
+def getCalSources(local_cal_dir: str, opts: argparse.Namespace, config: dict) -> tuple:
     local_folders = getCalDirList(local_cal_dir)
     if opts.local:
         if opts.update:
@@ -133,77 +24,97 @@ def parseCalLocalDirs(local_cal_dir: str, opts: argparse.Namespace, config: dict
                 local_folders = getCalDirList(local_cal_dir)
             else:
                 print(f"Error opdating local calibration folder: [{local_cal_dir}]")
-                return {}
-        local_folders = purgeDirs(local_folders, config)
+                return (local_cal_dir, [])
+    if opts.archive:
+        # The archive is brought up to date with the .cal tree, then read instead of it
+        ingestCalArchive(local_folders, opts.archive, opts.report, opts.jobs)
+        local_cal_dir = opts.archive
+        local_folders = getArchiveDays(opts.archive)
+    if opts.local or opts.archive:
+        local_folders = purgeDirs(local_folders, config['start_date'], config['end_date'])
     
     if not len(local_folders):
         print('No calibration found matching the selected time window... select a different time interval')
+    return (local_cal_dir, local_folders)
+
+def parseCalLocalDirs(local_cal_dir: str, opts: argparse.Namespace, config: dict) -> dict:
+    local_cal_dir, local_folders = getCalSources(local_cal_dir, opts, config)
+    if not len(local_folders):
         return {}
-    if opts.verbose:
-        print("Parsing calibration files...")
-
-    for cal_folder in tqdm(local_folders):
-        caldate.append(getDateFromDir(cal_folder))
-        ladder_dicts, sigmas = readCalDict(buildCalDict(cal_folder))
-        sigma.append(getMeanValue(ladder_dicts[0]))
-        sigma_values.append(getValues(ladder_dicts[0]))
-        sigma_raw.append(getMeanValue(ladder_dicts[1]))
-        sigma_raw_values.append(getValues(ladder_dicts[1]))
-        ped.append(getMeanValue(ladder_dicts[2]))
-        ped_values.append(getValues(ladder_dicts[2]))
-        cn.append(getMeanValue(ladder_dicts[3]))
-        cn_values.append(getValues(ladder_dicts[3]))
-        chfrac_s5.append(getChannelFraction(ladder_dicts[4]))
-        chfrac_s510.append(getChannelFraction(ladder_dicts[5]))
-        chfrac_s10.append(getChannelFraction(ladder_dicts[6]))
-        chsigmas.append(sigmas)
-    return {'date': caldate, 'sigma': sigma, 'sigma_values': sigma_values, 'sigma_raw': sigma_raw, 'sigma_raw_values': sigma_raw_values, 'pedestal': ped, 'pedestal_values': ped_values, 'cn': cn, 'cn_values': cn_values, 'chfrac_s5': chfrac_s5, 'chfrac_s510': chfrac_s510, 'chfrac_s10': chfrac_s10, 'chsigmas': chsigmas}
-
-def buildEvFigure(time_evolution: dict, plt_variable: str, plt_variable_label: str, plt_color: str, xaxis_interval: int, yaxis_title: str, plt_path: str) -> plt.figure:
-    fig, ax = plt.subplots(clear=True)
-    ax.plot(time_evolution['date'], time_evolution[plt_variable], label=plt_variable_label, color=plt_color)
-    if xaxis_interval:
-        ax.xaxis.set_major_locator(mdates.MonthLocator(interval=xaxis_interval))
-        if xaxis_interval<=3:
-            ax.xaxis.set_minor_locator(mdates.DayLocator())
-        else:
-            ax.xaxis.set_minor_locator(mdates.MonthLocator())
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-    fig.autofmt_xdate()
-    ax.set_ylabel(yaxis_title, fontsize=10)
-    plt.savefig(plt_path)
-    return fig
-
-def buildChSigmaEv(time_evolution: dict, xaxis_interval: int, plt_path: str) -> plt.figure:
+    return buildTimeEvolution(local_cal_dir, local_folders, opts.report, opts.jobs)
+
+def finalizeEvolutionSeries(series: dict, xinterval: int):
+    buildEvFigure(series, plt_variable="sigma", plt_variable_label="sigma", plt_color="firebrick", xaxis_interval=xinterval, yaxis_title="sigma").savefig("sigma_evolution.pdf")
+    buildEvFigure(series, plt_variable="sigma_raw", plt_variable_label="sigma raw", plt_color="darkorange", xaxis_interval=xinterval, yaxis_title="sigma raw").savefig("sigmaraw_evolution.pdf")
+    buildEvFigure(series, plt_variable="pedestal", plt_variable_label="pedestal", plt_color="forestgreen", xaxis_interval=xinterval, yaxis_title="pedestal" ).savefig("pedestal_evolution.pdf")
+    buildEvFigure(series, plt_variable="cn", plt_variable_label="common noise", plt_color="mediumturquoise", xaxis_interval=xinterval, yaxis_title="common noise").savefig("cn_evolution.pdf")
+    buildEvFigure(series, plt_variable="chfrac_s5", plt_variable_label="ch frac sigma < 5", plt_color="cornflowerblue", xaxis_interval=xinterval, yaxis_title="channel fraction sigma < 5").savefig("chfrac_sigma_5.pdf")
+    buildEvFigure(series, plt_variable="chfrac_s510", plt_variable_label="ch frac 5 < sigma < 10", plt_color="sandybrown", xaxis_interval=xinterval, yaxis_title="channel fraction 5 < sigma < 10").savefig("chfrac_sigma_5_10.pdf")
+    buildEvFigure(series, plt_variable="chfrac_s10", plt_variable_label="ch frac sigma > 10", plt_color="firebrick", xaxis_interval=xinterval, yaxis_title="channel fraction sigma > 10").savefig("chfrac_sigma_10.pdf")
     rcParams.update({'figure.autolayout': True})
-    fig, ax = plt.subplots(clear=True)
-    #ax.plot(time_evolution['date'], time_evolution['chfrac_s5'], label='ch frac sigma < 5', color='cornflowerblue')
-    ax.plot(time_evolution['date'], time_evolution['chfrac_s510'], label='ch frac 5 < sigma < 10', color='sandybrown')
-    ax.plot(time_evolution['date'], time_evolution['chfrac_s10'], label='ch frac sigma > 10', color='firebrick')
-    if xaxis_interval:
-        ax.xaxis.set_major_locator(mdates.MonthLocator(interval=xaxis_interval))
-        if xaxis_interval<=3:
-            ax.xaxis.set_minor_locator(mdates.DayLocator())
-        else:
-            ax.xaxis.set_minor_locator(mdates.MonthLocator())
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-    fig.autofmt_xdate()
-    plt.legend(bbox_to_anchor=(1.05, 0.5), loc='center left')
-    plt.savefig(plt_path)
-    return fig
-
-def buildVariableDistribution(time_evolution: dict, plt_variable: str, bins: int, xrange: tuple) -> plt.figure:
-    fig, ax = plt.subplots(clear=True)
-    ax.hist(time_evolution[plt_variable], bins, density=True, range=xrange)
-    return fig
-
-def buildROOThistos(time_evolution: dict, out_filename: str):
+    buildChSigmaEv(series, xaxis_interval=xinterval, fractions=['chfrac_s510', 'chfrac_s10'], legend=True).savefig("channel_noise_evolution.pdf")
+
+def getDayTimes(dates: list) -> np.ndarray:
+    return np.array([TDatime(cal_date.year, cal_date.month, cal_date.day, 12, 0, 0).Convert() for cal_date in dates], dtype=np.float64)
+
+def fillHisto(histo: TH1D, values: np.ndarray):
+    # Channel sigmas come from float32 copies (channel cube, sigma tree): rounded back to the 3 decimals of the .cal files,
+    # a sigma on a bin edge falls in the same bin as when read from the file
+    values = np.round(np.ascontiguousarray(values, dtype=np.float64), 3)
+    entries = histo.GetEntries()
+    histo.FillN(len(values), values, np.ones(len(values)))
+    histo.SetEntries(entries + len(values))
+
+def fillTimeEvolution(evolution: TH2D, evolution_profile: TProfile, day_times: np.ndarray, day_values: list):
+    # FillN runs the same per-entry accumulation as Fill, in the same order, so contents and stats are unchanged
+    xs = np.repeat(day_times, [len(values) for values in day_values])
+    ys = np.concatenate([np.asarray(values, dtype=np.float64) for values in day_values]) if len(day_values) else np.empty(0)
+    weights = np.ones(len(ys))
+    entries = evolution.GetEntries()
+    evolution.FillN(len(ys), xs, ys, weights)
+    evolution.SetEntries(entries + len(ys))
+    # TProfile::Fill does not count entries outside of the y range
+    in_range = ~np.isnan(ys)
+    if evolution_profile.GetYmin() != evolution_profile.GetYmax():
+        in_range &= (ys >= evolution_profile.GetYmin()) & (ys <= evolution_profile.GetYmax())
+    entries = evolution_profile.GetEntries()
+    evolution_profile.FillN(len(ys), xs, ys, weights)
+    evolution_profile.SetEntries(entries + int(np.count_nonzero(in_range)))
+
+def buildLadderSigmaHisto(root_filename: str, cal_date: date, ladder_idx: int = -1) -> TH1D:
+    infile = TFile(root_filename, "READ")
+    if not infile.IsOpen():
+        print(f"Error reading input TFile: [{root_filename}]")
+        return None
+    tree = infile.Get("sigmas/chsigmas")
+    if not tree:
+        print(f"No channel sigma tree in TFile: [{root_filename}]")
+        return None
+    tmpdate = TDatime(cal_date.year, cal_date.month, cal_date.day, 12, 0, 0).Convert()
+    day_sigmas = np.zeros(tree.GetLeaf("sigma").GetLen(), dtype=np.float32)
+    tree.SetBranchAddress("sigma", day_sigmas)
+    if tree.GetEntryWithIndex(tmpdate) < 0:
+        print(f"No calibration found for date: [{cal_date}]")
+        return None
+    if ladder_idx < 0:
+        histo = TH1D(f"hsigmach_{tmpdate}", f"hsigmach_{tmpdate}", 1000, 0, 100)
+        fillHisto(histo, day_sigmas)
+    else:
+        histo = TH1D(f"hsigmach_{tmpdate}_ladder_{ladder_idx}", f"hsigmach_{tmpdate}_ladder_{ladder_idx}", 1000, 0, 100)
+        histo.GetXaxis().SetTitle('#sigma (ADC)')
+        histo.GetYaxis().SetTitle('counts')
+        fillHisto(histo, day_sigmas.reshape(-1, nchannels)[ladder_idx])
+    histo.SetDirectory(0)
+    infile.Close()
+    return histo
+
+def initROOThistos(start_date: date, end_date: date, out_filename: str, sigma_tree: bool = False) -> dict:
     outfile = TFile(out_filename, "RECREATE")
     if not outfile.IsOpen():
         print(f"Error writing output TFile: [{out_filename}]")
 
-    start_time = TDatime(time_evolution['date'][0].year, time_evolution['date'][0].month, time_evolution['date'][0].day, 12, 0, 0).Convert()
-    end_time = TDatime(time_evolution['date'][-1].year, time_evolution['date'][-1].month, time_evolution['date'][-1].day, 12, 0, 0).Convert()
+    start_time = TDatime(start_date.year, start_date.month, start_date.day, 12, 0, 0).Convert()
+    end_time = TDatime(end_date.year, end_date.month, end_date.day, 12, 0, 0).Convert()
     bins = int((end_time-start_time)/86400)
     
     sigma_evolution = TH2D("sigma_evolution", "#sigma time evolution", bins, start_time, end_time, 100, 2, 4)
@@ -218,31 +129,6 @@ def buildROOThistos(time_evolution: dict, out_filename: str):
     cn_evolution = TH2D("cn_evolution", "Common Noise time evolution", bins, start_time, end_time, 100, 9, 13)
     cn_evolution_profile = TProfile("cn_evolution_profile", "Common Noise time evolution - profile", bins, start_time, end_time, 9, 13)
 
-    for idx, ladder_values in enumerate(time_evolution['sigma_values']):
-        for single_value in ladder_values:
-            tmpdate = TDatime(time_evolution['date'][idx].year, time_evolution['date'][idx].month, time_evolution['date'][idx].day, 12, 0, 0).Convert()
-            sigma_evolution.Fill(tmpdate, single_value)
-            sigma_evolution_profile.Fill(tmpdate, single_value)
-    
-    for idx, ladder_values in enumerate(time_evolution['sigma_raw_values']):
-        for single_value in ladder_values:
-            tmpdate = TDatime(time_evolution['date'][idx].year, time_evolution['date'][idx].month, time_evolution['date'][idx].day, 12, 0, 0).Convert()
-            sigma_raw_evolution.Fill(tmpdate, single_value)
-            sigma_raw_evolution_profile.Fill(tmpdate, single_value)
-
-    for idx, ladder_values in enumerate(time_evolution['pedestal_values']):
-        for single_value in ladder_values:
-            tmpdate = TDatime(time_evolution['date'][idx].year, time_evolution['date'][idx].month, time_evolution['date'][idx].day, 12, 0, 0).Convert()
-            pedestal_evolution.Fill(tmpdate, single_value)
-            pedestal_evolution_profile.Fill(tmpdate, single_value)
-
-    for idx, ladder_values in enumerate(time_evolution['cn_values']):
-        for single_value in ladder_values:
-            tmpdate = TDatime(time_evolution['date'][idx].year, time_evolution['date'][idx].month, time_evolution['date'][idx].day, 12, 0, 0).Convert()
-            cn_evolution.Fill(tmpdate, single_value)
-            cn_evolution_profile.Fill(tmpdate, single_value)
-    
-
     sigma_evolution.GetXaxis().SetTimeDisplay(1)
     sigma_evolution.GetXaxis().SetNdivisions(-503)
     sigma_evolution.GetXaxis().SetTimeFormat("%Y-%m-%d")
@@ -304,6 +190,62 @@ def buildROOThistos(time_evolution: dict, out_filename: str):
     cn_evolution_profile.SetLineWidth(0)
     cn_evolution_profile.SetMarkerStyle(20)
 
+    sigmas_dir = outfile.mkdir('sigmas')
+    outfile.cd()
+    return {
+        'outfile': outfile,
+        'sigmas_dir': sigmas_dir,
+        'evolutions': {
+            'sigma_values': (sigma_evolution, sigma_evolution_profile),
+            'sigma_raw_values': (sigma_raw_evolution, sigma_raw_evolution_profile),
+            'pedestal_values': (pedestal_evolution, pedestal_evolution_profile),
+            'cn_values': (cn_evolution, cn_evolution_profile)
+        },
+        'sigma_tree': sigma_tree,
+        'tree': None,
+        'trackers': []
+    }
+
+def fillROOThistos(root_histos: dict, day_values: dict):
+    day_time = getDayTimes([day_values['date']])
+    for key, (evolution, evolution_profile) in root_histos['evolutions'].items():
+        fillTimeEvolution(evolution, evolution_profile, day_time, [day_values[key]])
+
+    tmpdate = int(day_time[0])
+    chsigma = day_values['chsigmas']
+    root_histos['sigmas_dir'].cd()
+    if root_histos['sigma_tree']:
+        # One entry per day holding all the channel sigmas, written basket by basket as days are filled
+        if root_histos['tree'] is None:
+            root_histos['day_time'] = np.zeros(1, dtype=np.uint32)
+            root_histos['day_sigmas'] = np.zeros(np.size(chsigma), dtype=np.float32)
+            root_histos['tree'] = TTree("chsigmas", "channel sigmas per calibration day")
+            root_histos['tree'].Branch("date", root_histos['day_time'], "date/i")
+            root_histos['tree'].Branch("sigma", root_histos['day_sigmas'], f"sigma[{np.size(chsigma)}]/F")
+        root_histos['day_time'][0] = tmpdate
+        root_histos['day_sigmas'][:] = np.ravel(chsigma)
+        root_histos['tree'].Fill()
+    else:
+        # Ladder histograms are written right away, only the tracker ones are kept until the end
+        for ladder_idx, ladder in enumerate(chsigma): 
+            tmphisto = TH1D(f"hsigmach_{tmpdate}_ladder_{ladder_idx}",f"hsigmach_{tmpdate}_ladder_{ladder_idx}", 1000, 0, 100)
+            tmphisto.GetXaxis().SetTitle('#sigma (ADC)')
+            tmphisto.GetYaxis().SetTitle('counts')
+            fillHisto(tmphisto, ladder)
+            tmphisto.Write()
+        tmphisto_tracker = TH1D(f"hsigmach_{tmpdate}",f"hsigmach_{tmpdate}", 1000, 0, 100)
+        fillHisto(tmphisto_tracker, np.ravel(chsigma))
+        root_histos['trackers'].append(tmphisto_tracker)
+    root_histos['outfile'].cd()
+
+def finalizeROOThistos(root_histos: dict):
+    outfile = root_histos['outfile']
+    sigma_evolution, sigma_evolution_profile = root_histos['evolutions']['sigma_values']
+    sigma_raw_evolution, sigma_raw_evolution_profile = root_histos['evolutions']['sigma_raw_values']
+    pedestal_evolution, pedestal_evolution_profile = root_histos['evolutions']['pedestal_values']
+    cn_evolution, cn_evolution_profile = root_histos['evolutions']['cn_values']
+    outfile.cd()
+
     sigma_evolution.Write()
     sigma_evolution_profile.Write()
     sigma_raw_evolution.Write()
@@ -313,21 +255,6 @@ def buildROOThistos(time_evolution: dict, out_filename: str):
     cn_evolution.Write()
     cn_evolution_profile.Write()
     
-    sigma_distribution_per_day = []
-    sigma_distribution_per_day_alltracker = []
-    for idx, chsigma in enumerate(time_evolution['chsigmas']):
-        tmpdate = TDatime(time_evolution['date'][idx].year, time_evolution['date'][idx].month, time_evolution['date'][idx].day, 12, 0, 0).Convert()
-        tmphisto_tracker = TH1D(f"hsigmach_{tmpdate}",f"hsigmach_{tmpdate}", 1000, 0, 100)
-        for ladder_idx, ladder in enumerate(chsigma): 
-            tmphisto = TH1D(f"hsigmach_{tmpdate}_ladder_{ladder_idx}",f"hsigmach_{tmpdate}_ladder_{ladder_idx}", 1000, 0, 100)
-            tmphisto.GetXaxis().SetTitle('#sigma (ADC)')
-            tmphisto.GetYaxis().SetTitle('counts')
-            for channel_noise_adc in ladder:
-                tmphisto.Fill(channel_noise_adc)
-                tmphisto_tracker.Fill(channel_noise_adc)
-            sigma_distribution_per_day.append(tmphisto)
-        sigma_distribution_per_day_alltracker.append(tmphisto_tracker)
-
     gStyle.SetLineWidth(3)
     
     canvas_sigma = TCanvas("canvas_sigma", "sigma Time Evolution", 700, 700)
@@ -387,28 +314,44 @@ def buildROOThistos(time_evolution: dict, out_filename: str):
     canvas_pedestal.Write()
     canvas_cn.Write()
 
-    outfile.mkdir('sigmas')
-    outfile.cd('sigmas')
-    for histo in sigma_distribution_per_day:
-        histo.Write()
-    for histo in sigma_distribution_per_day_alltracker:
+    root_histos['sigmas_dir'].cd()
+    if root_histos['tree'] is not None:
+        root_histos['tree'].BuildIndex("date")
+        root_histos['tree'].Write()
+    for histo in root_histos['trackers']:
         histo.Write()
 
     outfile.Close()
 
+def buildROOThistos(time_evolution: dict, out_filename: str, sigma_tree: bool = False):
+    root_histos = initROOThistos(time_evolution['date'][0], time_evolution['date'][-1], out_filename, sigma_tree)
+    for day_idx in range(len(time_evolution['date'])):
+        fillROOThistos(root_histos, {key: time_evolution[key][day_idx] for key in time_evolution})
+    finalizeROOThistos(root_histos)
+
 def buildStkPlots(opts: argparse.Namespace, config: dict):
-    local_cal_dir = opts.local if opts.local else "cal"
-    time_evolution = parseCalLocalDirs(local_cal_dir, opts, config)
+    local_cal_dir, local_folders = getCalSources(opts.local if opts.local else "cal", opts, config)
+    if not len(local_folders):
+        return
     if opts.verbose:
         print(f"Getting time evolution information from local dir: {local_cal_dir}")
 
-    xinterval = 6
-    buildEvFigure(time_evolution, plt_variable="sigma", plt_variable_label="sigma", plt_color="firebrick", xaxis_interval=xinterval, yaxis_title="sigma", plt_path="sigma_evolution.pdf")
-    buildEvFigure(time_evolution, plt_variable="sigma_raw", plt_variable_label="sigma raw", plt_color="darkorange", xaxis_interval=xinterval, yaxis_title="sigma raw", plt_path="sigmaraw_evolution.pdf")
-    buildEvFigure(time_evolution, plt_variable="pedestal", plt_variable_label="pedestal", plt_color="forestgreen", xaxis_interval=xinterval, yaxis_title="pedestal" , plt_path="pedestal_evolution.pdf")
-    buildEvFigure(time_evolution, plt_variable="cn", plt_variable_label="common noise", plt_color="mediumturquoise", xaxis_interval=xinterval, yaxis_title="common noise", plt_path="cn_evolution.pdf")
-    buildEvFigure(time_evolution, plt_variable="chfrac_s5", plt_variable_label="ch frac sigma < 5", plt_color="cornflowerblue", xaxis_interval=xinterval, yaxis_title="channel fraction sigma < 5", plt_path="chfrac_sigma_5.pdf")
-    buildEvFigure(time_evolution, plt_variable="chfrac_s510", plt_variable_label="ch frac 5 < sigma < 10", plt_color="sandybrown", xaxis_interval=xinterval, yaxis_title="channel fraction 5 < sigma < 10", plt_path="chfrac_sigma_5_10.pdf")
-    buildEvFigure(time_evolution, plt_variable="chfrac_s10", plt_variable_label="ch frac sigma > 10", plt_color="firebrick", xaxis_interval=xinterval, yaxis_title="channel fraction sigma > 10", plt_path="chfrac_sigma_10.pdf")
-    buildChSigmaEv(time_evolution, xaxis_interval=xinterval, plt_path="channel_noise_evolution.pdf") 
-    buildROOThistos(time_evolution, out_filename="ladder_time_info.root")
+    # Each day goes straight into the aggregators, so that only one day of channel data is held at a time
+    timings = opts.report.timings
+    series = initEvolutionSeries()
+    drift_monitor = initDriftMonitor(local_cal_dir)
+    root_histos = initROOThistos(getCalSourceDate(local_folders[0]), getCalSourceDate(local_folders[-1]), out_filename="ladder_time_info.root", sigma_tree=opts.sigma_tree)
+    for day_values in iterTimeEvolution(local_cal_dir, local_folders, opts.report, opts.jobs):
+        fillEvolutionSeries(series, day_values)
+        fillDriftMonitor(drift_monitor, day_values)
+        with timings.span("root_fill", days=1):
+            fillROOThistos(root_histos, day_values)
+    with timings.stage("figures", files=8):
+        finalizeEvolutionSeries(series, xinterval=6)
+    with timings.stage("root_write"):
+        finalizeROOThistos(root_histos)
+    drift_alerts = finalizeDriftMonitor(drift_monitor)
+    for alert in drift_alerts:
+        opts.report.debug(f"{alert['date']} {alert['kind']:12s} {alert['variable']:8s} TRB0{alert['trb']} ladder {alert['ladder']:2d}: {alert['value']} (mean {alert['mean']}, std {alert['std']}, z {alert['z']})")
+    if drift_monitor['new_days']:
+        opts.report.info(f"{drift_monitor['new_days']} new calibration days monitored: {len(drift_alerts)} drift alerts appended to [{getDriftDir(local_cal_dir)}/alerts.jsonl]")
@@ -1,7 +1,7 @@
 from datetime import date
 
 def parseConfigFile():
-	dConfig = {'farmAddress': "", 'cal_XRDFS_path': "", 'start_date': date(1,1,1), 'end_date': date(1,1,1)}
+	dConfig = {'farmAddress': "", 'cal_XRDFS_path': "", 'start_date': date(1,1,1), 'end_date': date(1,1,1), 'xrdfs_jobs': 1, 'xrdcp_jobs': 1, 'xrdcp_retries': 3, 'xrdcp_parallel': 4, 'recheck_days': 7, 'raw_policy': "latest", 'transport': "auto", 'local_root': ""}
 	
 	config_params = []
 	with open("skim_xrootd.conf", "r") as _config:
@@ -14,6 +14,22 @@ def parseConfigFile():
 			dConfig['farmAddress'] = config_params[idx+1]
 		if word == "cal_XRDFS_path":
 			dConfig['cal_XRDFS_path'] = config_params[idx+1]
+		if word == "xrdfs_jobs":
+			dConfig['xrdfs_jobs'] = int(config_params[idx+1])
+		if word == "xrdcp_jobs":
+			dConfig['xrdcp_jobs'] = int(config_params[idx+1])
+		if word == "xrdcp_retries":
+			dConfig['xrdcp_retries'] = int(config_params[idx+1])
+		if word == "xrdcp_parallel":
+			dConfig['xrdcp_parallel'] = int(config_params[idx+1])
+		if word == "recheck_days":
+			dConfig['recheck_days'] = int(config_params[idx+1])
+		if word == "raw_policy":
+			dConfig['raw_policy'] = config_params[idx+1]
+		if word == "transport":
+			dConfig['transport'] = config_params[idx+1]
+		if word == "local_root":
+			dConfig['local_root'] = config_params[idx+1]
 		if word == "start_year":
 			year = int(config_params[idx+1])
 		if word == "start_month":
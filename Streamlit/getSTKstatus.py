@@ -1,6 +1,11 @@
 import streamlit as st
+import sys
+import os
+# The shared analysis core lives next to the Streamlit folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from downloadCal import getCalFiles
 from buildSTKplots import buildStkPlots
+from streamlitReport import resetRunTimings, showTimings
 
 def appSettings() -> tuple:
     st.write("""
@@ -10,10 +15,11 @@ def appSettings() -> tuple:
     st.sidebar.write('**Settings**')
     start_date = st.sidebar.date_input("Start date", help="Select the calibration start date")
     end_date = st.sidebar.date_input("End date", help="Select the calibration end date")
-    data_storage_opt = st.sidebar.selectbox('Choose how to get calibration files', ("Download through XROOTD", 'Use local dir'), index=1)
+    data_storage_opt = st.sidebar.selectbox('Choose how to get calibration files', ("Download through XROOTD", 'Use local dir', 'Use local archive'), index=1)
+    jobs = st.sidebar.number_input("Parsing jobs", min_value=1, max_value=os.cpu_count(), value=1, help="Number of parallel calibration parsing processes")
     status = False
     datecheck = False
-    return (start_date, end_date, data_storage_opt, status, datecheck)
+    return (start_date, end_date, data_storage_opt, jobs, status, datecheck)
 
 def plotSettings() -> tuple:
     st.sidebar.write('**Plot options**')
@@ -21,31 +27,58 @@ def plotSettings() -> tuple:
     plot_sigmas = st.sidebar.checkbox('Plot sigma & sigma row', value=True)
     plot_pedestal = st.sidebar.checkbox('Plot pedestal', value=True)
     plot_cn = st.sidebar.checkbox('Plot Common Noise', value=True)
+    anomaly_query = None
+    if st.sidebar.checkbox('Show channel anomalies', value=False, help='List the channel noise band and status flag transitions in the selected time window'):
+        anomaly_ladders = st.sidebar.multiselect('Anomaly ladders', list(range(192)), help='Ladder index (0-191); all ladders if none is selected')
+        anomaly_query = (anomaly_ladders, st.sidebar.radio('Anomalies', ('Noise band and status transitions', 'Noise band transitions', 'Channels with sigma > 5 at the end date', 'Channels with sigma > 10 at the end date')))
+    ladder_query = None
+    if st.sidebar.checkbox('Plot TRB / ladder subsets', value=False, help='Time evolution of selected TRBs or ladders, from the already parsed calibrations'):
+        ladder_metric = st.sidebar.selectbox('Ladder metric', ('sigma', 'sigma_raw', 'pedestal', 'cn', 'chfrac_s5', 'chfrac_s510', 'chfrac_s10'))
+        ladder_trbs = st.sidebar.multiselect('TRBs', list(range(8)), help='All TRBs if none is selected')
+        ladder_ladders = st.sidebar.multiselect('Ladders', list(range(24)), help='Ladder index within the TRB; all ladders if none is selected')
+        ladder_query = (ladder_metric, tuple(ladder_trbs), tuple(ladder_ladders), st.sidebar.radio('One curve per', ('trb', 'ladder', 'all')))
+    window_query = None
+    compare_windows = st.sidebar.multiselect('Compare time windows', ('Selected dates', 'Last 30 days', 'Last 365 days', 'Full mission'), help='Summary and distributions of each window, all read in a single pass')
+    window_grouping = st.sidebar.selectbox('Calendar windows', ('none', 'weekly', 'monthly', 'yearly'), help='Also compare every calendar week, month or year')
+    if len(compare_windows) or window_grouping != 'none':
+        window_query = (tuple(compare_windows), window_grouping if window_grouping != 'none' else "", st.sidebar.selectbox('Window metric', ('sigma', 'sigma_raw', 'pedestal', 'cn', 'chfrac_s5', 'chfrac_s510', 'chfrac_s10')))
     xinterval = st.sidebar.slider('X axis interval', min_value = 0, max_value=6, value=1, help='Plots X axis interval in months')
-    return (plot_sigmas, plot_pedestal, plot_cn, xinterval, live_plots)
+    export_pdf = st.sidebar.button("Export PDF", help="Save the time evolution figures as PDF files, in the background")
+    return (plot_sigmas, plot_pedestal, plot_cn, anomaly_query, ladder_query, window_query, xinterval, live_plots, export_pdf)
 
 def main():
     st.set_page_config(layout="wide")
-    start_date, end_date, data_storage_opt, status, datecheck = appSettings()
+    timings = resetRunTimings()
+    start_date, end_date, data_storage_opt, jobs, status, datecheck = appSettings()
     if data_storage_opt == "Download through XROOTD":
         xrootd_entrypoint = st.sidebar.text_input('XROOTD DAMPE entrypoint:', "root://xrootd-dampe.cloud.ba.infn.it//")
         calib_xrdfs_path = st.sidebar.text_input('XROOTD DAMPE calibration files:', "/FM/FlightData/CAL/STK/")
-        plot_sigmas, plot_pedestal, plot_cn, xinterval, int_plots = plotSettings()
-        config = {"farmAddress": xrootd_entrypoint,  "cal_XRDFS_path": calib_xrdfs_path, "start_date": start_date, "end_date": end_date}
+        xrdfs_jobs = st.sidebar.number_input('XROOTD concurrent listings:', min_value=1, max_value=64, value=8, help="Number of xrdfs directory listings run at the same time")
+        xrdcp_jobs = st.sidebar.number_input('XROOTD concurrent transfers:', min_value=1, max_value=32, value=4, help="Number of calibration days downloaded at the same time")
+        transport = st.sidebar.selectbox('XROOTD client:', ("auto", "xrootd", "cli"), help="XRootD Python bindings (one connection for all the calls), xrdfs/xrdcp commands, or the bindings when installed")
+        raw_policy = st.sidebar.selectbox('Calibration of the day:', ("latest", "earliest"), help="Complete STK_CALIB_RAW folder analysed when a day has more than one")
+        plot_sigmas, plot_pedestal, plot_cn, anomaly_query, ladder_query, window_query, xinterval, int_plots, export_pdf = plotSettings()
+        config = {"farmAddress": xrootd_entrypoint,  "cal_XRDFS_path": calib_xrdfs_path, "start_date": start_date, "end_date": end_date, "xrdfs_jobs": xrdfs_jobs, "xrdcp_jobs": xrdcp_jobs, "transport": transport, "raw_policy": raw_policy}
         local_cal_dir = "cal"
         if st.sidebar.button("Start Analysis"):
             if (getCalFiles(config)):
                 st.balloons()
                 status = True
-                datecheck = True
+    elif data_storage_opt == 'Use local archive':
+        local_cal_dir = st.sidebar.text_input("Please, select the calibration archive:", "archive", help="Select the local calibration archive, as built by the Console --archive option")
+        plot_sigmas, plot_pedestal, plot_cn, anomaly_query, ladder_query, window_query, xinterval, int_plots, export_pdf = plotSettings()
+        if st.sidebar.button("Start Analysis"):
+            status = True
     else:
         local_cal_dir = st.sidebar.text_input("Please, select the calibration directory:", "cal", help="Select the local calibration directory")
-        plot_sigmas, plot_pedestal, plot_cn, xinterval, int_plots = plotSettings()
+        plot_sigmas, plot_pedestal, plot_cn, anomaly_query, ladder_query, window_query, xinterval, int_plots, export_pdf = plotSettings()
         if st.sidebar.button("Start Analysis"):
             status = True
 
-    if status:
-        buildStkPlots(local_cal_dir, start_date, end_date, datecheck, plot_sigmas, plot_pedestal, plot_cn, xinterval, int_plots)
+    if status or export_pdf:
+        buildStkPlots(local_cal_dir, start_date, end_date, datecheck, plot_sigmas, plot_pedestal, plot_cn, anomaly_query, ladder_query, window_query, xinterval, int_plots, jobs, data_storage_opt == 'Use local archive', export_pdf)
+    # Stages run in this rerun (download, parsing), if any
+    showTimings(timings)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import streamlit as st
+import threading
+from stkcore import StageTimings
+
+# Each script run of a session goes through a single thread, which gets its own timings
+run_timings = threading.local()
+
+
+def resetRunTimings() -> StageTimings:
+    run_timings.current = StageTimings()
+    return run_timings.current
+
+class StreamlitReport:
+    # Same methods as stkcore.ConsoleReport, shown in the page
+    def __init__(self):
+        self.timings = getattr(run_timings, 'current', None) or resetRunTimings()
+
+    def debug(self, message: str):
+        print(message)
+
+    def info(self, message: str):
+        st.info(message)
+
+    def error(self, message: str):
+        st.error(message)
+
+    def progress(self, iterable, total: int):
+        perc_complete = 0.
+        step = 1./total if total else 1.
+        bar = st.progress(perc_complete)
+        for item in iterable:
+            yield item
+            perc_complete += step
+            bar.progress(round(perc_complete, 1))
+
+def showTimings(timings: StageTimings):
+    timings.close()
+    summary = timings.summary()
+    if len(summary):
+        with st.beta_expander("Stage timings"):
+            st.table(summary)
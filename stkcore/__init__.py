@@ -0,0 +1,13 @@
+# Calibration analysis core shared by the Console and Streamlit front-ends:
+# discover -> fetch -> parse -> aggregate -> render
+from .report import ConsoleReport
+from .instrumentation import StageTimings
+from .transport import TransportError, getTransport
+from .downloadCal import getDateFromDir, checkLocalDir, parseXrootDfiles, downloadFiles, checkDownloadedFiles
+from .calReader import getCalDirList, getCalSourceDate, parseCalDay, iterCalDays, ingestCalArchive
+from .calArchive import getArchiveDays
+from .timeEvolution import series_keys, evolution_keys, ladder_metrics, getLadderArray, purgeDirs, iterTimeEvolution, buildTimeEvolution, initEvolutionSeries, fillEvolutionSeries
+from .anomalyIndex import queryTransitions, getNoisyChannels
+from .driftMonitor import initDriftMonitor, fillDriftMonitor, finalizeDriftMonitor, loadDriftAlerts
+from .analysisWindows import window_groupings, window_variables, getWindows, buildWindowEvolution, summarizeWindows
+from .figures import buildEvFigure, buildChSigmaEv, buildVariableDistribution, buildLadderEvFigure, buildWindowDistribution, buildWindowSummaryFigure
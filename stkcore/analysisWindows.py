@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta
+import pandas as pd
+import numpy as np
+from .report import ConsoleReport
+from .calReader import getCalSourceDate
+from .timeEvolution import series_keys, evolution_keys, purgeDirs, iterTimeEvolution, initEvolutionSeries, fillEvolutionSeries
+
+window_groupings = ['weekly', 'monthly', 'yearly']
+window_variables = ['sigma', 'sigma_raw', 'pedestal', 'cn', 'chfrac_s5', 'chfrac_s510', 'chfrac_s10']
+
+
+def parseWindow(window: str, first_date: date, last_date: date) -> tuple:
+    # [label=]YYYYMMDD:YYYYMMDD with either end left open (':' is the whole mission), or [label=]lastN for the N days up to the last calibration
+    label, spec = window.split('=', 1) if '=' in window else (window, window)
+    try:
+        if spec.startswith('last'):
+            if int(spec[4:]) < 1:
+                raise ValueError
+            start, end = (last_date - timedelta(days=int(spec[4:])-1), last_date)
+        else:
+            start, end = spec.split(':')
+            start, end = (datetime.strptime(start, '%Y%m%d').date() if start else first_date, datetime.strptime(end, '%Y%m%d').date() if end else last_date)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid window [{window}]: expected [label=]YYYYMMDD:YYYYMMDD or [label=]lastN") from None
+    if end < start:
+        raise ValueError(f"Invalid window [{window}]: ends on {end}, before its start on {start}")
+    return (label, start, end)
+
+def getCalendarWindows(first_date: date, last_date: date, grouping: str) -> dict:
+    windows = {}
+    cal_date = first_date
+    while cal_date <= last_date:
+        if grouping == 'weekly':
+            start = cal_date - timedelta(days=cal_date.weekday())
+            end = start + timedelta(days=6)
+            label = f"{start.isocalendar()[0]}-W{start.isocalendar()[1]:02d}"
+        elif grouping == 'monthly':
+            start = cal_date.replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            label = start.strftime('%Y-%m')
+        else:
+            start = date(cal_date.year, 1, 1)
+            end = date(cal_date.year, 12, 31)
+            label = str(cal_date.year)
+        windows[label] = (start, end)
+        cal_date = end + timedelta(days=1)
+    return windows
+
+def getWindows(local_folders: list, windows: list = [], grouping: str = "") -> dict:
+    # Open ends and 'lastN' windows are taken from the first and last calibration available
+    first_date = getCalSourceDate(local_folders[0])
+    last_date = getCalSourceDate(local_folders[-1])
+    resolved = {}
+    for window in windows:
+        label, start, end = parseWindow(window, first_date, last_date)
+        resolved[label] = (start, end)
+    if grouping:
+        resolved.update(getCalendarWindows(first_date, last_date, grouping))
+    return resolved
+
+def initWindowSeries(windows: dict, keys: list = series_keys) -> dict:
+    return {label: {'start': start, 'end': end, 'series': initEvolutionSeries(keys)} for label, (start, end) in windows.items()}
+
+def fillWindowSeries(window_series: dict, day_values: dict):
+    for window in window_series.values():
+        if window['start'] <= day_values['date'] <= window['end']:
+            fillEvolutionSeries(window['series'], day_values)
+
+def buildWindowEvolution(local_cal_dir: str, local_folders: list, windows: dict, report: ConsoleReport, jobs: int = 1, ladder_values: bool = False) -> dict:
+    # Days are read (from the summary cache, or parsed) once, in a single pass over the union of the windows, and handed to every window they fall in
+    selected = set(cal_folder for start, end in windows.values() for cal_folder in purgeDirs(local_folders, start, end))
+    window_series = initWindowSeries(windows, evolution_keys if ladder_values else series_keys)
+    for day_values in iterTimeEvolution(local_cal_dir, [cal_folder for cal_folder in local_folders if cal_folder in selected], report, jobs, ladder_values):
+        fillWindowSeries(window_series, day_values)
+    return {label: window['series'] for label, window in window_series.items()}
+
+def summarizeWindows(window_evolutions: dict, windows: dict) -> pd.DataFrame:
+    rows = []
+    for label, time_evolution in window_evolutions.items():
+        row = {'window': label, 'start': windows[label][0], 'end': windows[label][1], 'days': len(time_evolution['date'])}
+        for variable in window_variables:
+            values = np.asarray(time_evolution[variable], dtype=np.float64)
+            row[f"{variable}_mean"] = values.mean() if len(values) else np.nan
+            row[f"{variable}_std"] = values.std() if len(values) else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows)
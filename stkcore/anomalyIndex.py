@@ -0,0 +1,127 @@
+from datetime import date
+import pandas as pd
+import numpy as np
+import os
+
+anomaly_dir_name = ".anomaly"
+state_day_shape = (192, 384)
+status_columns = ['status', 'status_2', 'status_3']
+band_labels = ['sigma < 5', '5 < sigma < 10', 'sigma > 10']
+nladders_trb = 24
+
+
+def getAnomalyDir(local_cal_dir: str) -> str:
+    return f"{local_cal_dir}/{anomaly_dir_name}"
+
+def getChannelStates(chsigma: np.ndarray, status: np.ndarray) -> np.ndarray:
+    # One byte per channel: noise band in the two lowest bits, then one bit per status flag
+    states = (chsigma >= 5).astype(np.uint8) + (chsigma > 10)
+    for flag_idx in range(status.shape[-1]):
+        states |= (status[:, :, flag_idx] != 0).astype(np.uint8) << (2 + flag_idx)
+    return states
+
+def loadStateIndex(local_cal_dir: str) -> dict:
+    anomaly_dir = getAnomalyDir(local_cal_dir)
+    if not os.path.isfile(f"{anomaly_dir}/dates.npy"):
+        return {}
+    return {cal_date: row for row, cal_date in enumerate(np.load(f"{anomaly_dir}/dates.npy").astype(object))}
+
+def openStates(local_cal_dir: str, mode: str = 'r') -> np.memmap:
+    nrows = len(loadStateIndex(local_cal_dir))
+    if not nrows:
+        return np.empty((0,) + state_day_shape, dtype=np.uint8)
+    return np.memmap(f"{getAnomalyDir(local_cal_dir)}/states.u8", dtype=np.uint8, mode=mode, shape=(nrows,) + state_day_shape)
+
+def appendStateDays(local_cal_dir: str, state_days: dict):
+    # Same layout as the channel cube: rows in arrival order, their dates in dates.npy
+    anomaly_dir = getAnomalyDir(local_cal_dir)
+    os.makedirs(anomaly_dir, exist_ok=True)
+    index = loadStateIndex(local_cal_dir)
+    known_days = [cal_date for cal_date in state_days if cal_date in index]
+    if len(known_days):
+        states = openStates(local_cal_dir, mode='r+')
+        for cal_date in known_days:
+            states[index[cal_date]] = state_days[cal_date]
+        states.flush()
+        del states
+    new_days = [cal_date for cal_date in state_days if cal_date not in index]
+    if len(new_days):
+        with open(f"{anomaly_dir}/states.u8", "ab") as _states:
+            _states.truncate(len(index)*int(np.prod(state_day_shape)))
+            for cal_date in new_days:
+                _states.write(np.ascontiguousarray(state_days[cal_date], dtype=np.uint8).tobytes())
+        dates = sorted(index, key=index.get) + new_days
+        np.save(f"{anomaly_dir}/dates.tmp.npy", np.array(dates, dtype='datetime64[D]'))
+        os.replace(f"{anomaly_dir}/dates.tmp.npy", f"{anomaly_dir}/dates.npy")
+
+def buildTransitionIndex(local_cal_dir: str):
+    # Days are walked in date order, keeping only the channels whose state differs from the day before.
+    # Channels already out of the nominal state on the first day get a transition on that day
+    index = loadStateIndex(local_cal_dir)
+    states = openStates(local_cal_dir)
+    transitions = {'date': [], 'ladder': [], 'channel': [], 'state_from': [], 'state_to': []}
+    previous = np.zeros(state_day_shape, dtype=np.uint8)
+    for cal_date in sorted(index):
+        day_states = np.asarray(states[index[cal_date]])
+        ladders, channels = np.nonzero(day_states != previous)
+        transitions['date'].append(np.full(len(ladders), np.datetime64(cal_date, 'D')))
+        transitions['ladder'].append(ladders.astype(np.uint8))
+        transitions['channel'].append(channels.astype(np.uint16))
+        transitions['state_from'].append(previous[ladders, channels])
+        transitions['state_to'].append(day_states[ladders, channels])
+        previous = day_states
+    columns = {key: np.concatenate(values) if len(values) else np.empty(0) for key, values in transitions.items()}
+    np.savez(f"{getAnomalyDir(local_cal_dir)}/transitions.tmp.npz", **columns)
+    os.replace(f"{getAnomalyDir(local_cal_dir)}/transitions.tmp.npz", f"{getAnomalyDir(local_cal_dir)}/transitions.npz")
+
+def loadTransitions(local_cal_dir: str) -> dict:
+    if not os.path.isfile(f"{getAnomalyDir(local_cal_dir)}/transitions.npz"):
+        return {}
+    with np.load(f"{getAnomalyDir(local_cal_dir)}/transitions.npz") as columns:
+        return {key: columns[key] for key in columns.files}
+
+def getTransitionFrame(transitions: dict, selection: np.ndarray) -> pd.DataFrame:
+    ladders = transitions['ladder'][selection].astype(np.intp)
+    state_from = transitions['state_from'][selection]
+    state_to = transitions['state_to'][selection]
+    frame = pd.DataFrame({'date': transitions['date'][selection], 'trb': ladders//nladders_trb, 'ladder': ladders % nladders_trb, 'ladder_idx': ladders, 'channel': transitions['channel'][selection],
+        'band_from': [band_labels[band] for band in state_from & 3], 'band_to': [band_labels[band] for band in state_to & 3]})
+    for flag_idx, flag in enumerate(status_columns):
+        frame[f"{flag}_from"] = (state_from >> (2 + flag_idx)) & 1
+        frame[f"{flag}_to"] = (state_to >> (2 + flag_idx)) & 1
+    return frame
+
+def queryTransitions(local_cal_dir: str, start_date: date = None, end_date: date = None, ladders: list = None, bands_only: bool = False) -> pd.DataFrame:
+    transitions = loadTransitions(local_cal_dir)
+    if not len(transitions):
+        return getTransitionFrame({key: np.empty(0, dtype=np.uint8) for key in ['date', 'ladder', 'channel', 'state_from', 'state_to']}, slice(None))
+    # Transitions are stored in date order, so the window is found by bisection
+    first = np.searchsorted(transitions['date'], np.datetime64(start_date, 'D'), side='left') if start_date else 0
+    last = np.searchsorted(transitions['date'], np.datetime64(end_date, 'D'), side='right') if end_date else len(transitions['date'])
+    selection = np.zeros(len(transitions['date']), dtype=bool)
+    selection[first:last] = True
+    if ladders is not None:
+        selection &= np.isin(transitions['ladder'], ladders)
+    if bands_only:
+        selection &= (transitions['state_from'] & 3) != (transitions['state_to'] & 3)
+    return getTransitionFrame(transitions, selection)
+
+def getNoisyChannels(local_cal_dir: str, cal_date: date = None, min_band: int = 2, ladders: list = None) -> pd.DataFrame:
+    # Channels in a band at least min_band on cal_date (the last indexed day by default), with the date they entered it
+    transitions = loadTransitions(local_cal_dir)
+    if not len(transitions):
+        return pd.DataFrame(columns=['trb', 'ladder', 'ladder_idx', 'channel', 'band', 'since'])
+    last = np.searchsorted(transitions['date'], np.datetime64(cal_date, 'D'), side='right') if cal_date else len(transitions['date'])
+    band_from = transitions['state_from'][:last] & 3
+    band_to = transitions['state_to'][:last] & 3
+    band_changes = np.nonzero(band_from != band_to)[0]
+    # The last band change of each channel tells its band on cal_date, and since when
+    channel_keys = transitions['ladder'][band_changes].astype(np.intp)*state_day_shape[1] + transitions['channel'][band_changes]
+    _, last_changes = np.unique(channel_keys[::-1], return_index=True)
+    last_changes = band_changes[len(band_changes) - 1 - last_changes]
+    last_changes = last_changes[band_to[last_changes] >= min_band]
+    if ladders is not None:
+        last_changes = last_changes[np.isin(transitions['ladder'][last_changes], ladders)]
+    ladder_idx = transitions['ladder'][last_changes].astype(np.intp)
+    return pd.DataFrame({'trb': ladder_idx//nladders_trb, 'ladder': ladder_idx % nladders_trb, 'ladder_idx': ladder_idx, 'channel': transitions['channel'][last_changes],
+        'band': [band_labels[band] for band in band_to[last_changes]], 'since': transitions['date'][last_changes]}).sort_values(['ladder_idx', 'channel'], ignore_index=True)
@@ -0,0 +1,42 @@
+from datetime import date
+import numpy as np
+import os
+from .calValidation import cal_columns
+
+archive_columns = {'ped': np.float32, 'sigma_raw': np.float32, 'sigma': np.float32, 'status': np.uint8, 'status_2': np.uint8, 'status_3': np.uint8}
+
+nvachannels = 64
+
+
+def getArchiveDayPath(archive_dir: str, cal_date: date) -> str:
+    return f"{archive_dir}/{cal_date.year}/{cal_date.strftime('%Y%m%d')}.npz"
+
+def getArchiveDays(archive_dir: str) -> list:
+    archive_days = []
+    if os.path.isdir(archive_dir):
+        for year_dir in [year for year in os.listdir(archive_dir) if year.startswith('20')]:
+            archive_days += [f"{archive_dir}/{year_dir}/{day}" for day in os.listdir(f"{archive_dir}/{year_dir}") if day.endswith('.npz') and not day.endswith('.tmp.npz')]
+    archive_days.sort()
+    return archive_days
+
+def writeArchiveDay(archive_dir: str, cal_date: date, block: np.ndarray):
+    day_path = getArchiveDayPath(archive_dir, cal_date)
+    os.makedirs(os.path.dirname(day_path), exist_ok=True)
+    # (TRB, ladder) of each block row, in buildCalDict order
+    nladders_trb = len(block)//8
+    columns = {'trb': np.repeat(np.arange(8, dtype=np.uint8), nladders_trb), 'ladder': np.tile(np.arange(nladders_trb, dtype=np.uint8), 8)}
+    for column in archive_columns:
+        columns[column] = block[:, :, cal_columns.index(column)].astype(archive_columns[column])
+    np.savez(f"{day_path[:-4]}.tmp.npz", **columns)
+    os.replace(f"{day_path[:-4]}.tmp.npz", day_path)
+
+def readArchiveDay(day_path: str) -> np.ndarray:
+    with np.load(day_path) as columns:
+        block = np.empty(columns['sigma'].shape + (len(cal_columns),))
+        channels = np.arange(block.shape[1])
+        block[:, :, cal_columns.index('ch')] = channels
+        block[:, :, cal_columns.index('va')] = channels//nvachannels
+        block[:, :, cal_columns.index('chva')] = channels % nvachannels
+        for column in archive_columns:
+            block[:, :, cal_columns.index(column)] = columns[column]
+    return block
@@ -0,0 +1,62 @@
+from datetime import date
+from bisect import bisect_left, bisect_right
+import json
+import time
+import os
+
+index_dir_name = ".calindex"
+# Folders changed less than this ago may change again within the same mtime tick (coarse on NFS): they are scanned again next time
+racy_mtime_ns = 2*10**9
+
+
+def getIndexDir(local_cal_dir: str) -> str:
+    return f"{local_cal_dir}/{index_dir_name}"
+
+def isDayDir(name: str) -> bool:
+    return len(name) == 8 and name.startswith('20') and name.isdigit()
+
+def getTrustedMtime(mtime_ns: int) -> int:
+    return mtime_ns if time.time_ns() - mtime_ns > racy_mtime_ns else -1
+
+def scanDayDir(day_dir: str, mtime_ns: int) -> dict:
+    # Only the number of calibration files is kept: names come from the directory listing, without any stat
+    with os.scandir(day_dir) as entries:
+        ncals = sum(1 for entry in entries if entry.name.endswith('.cal'))
+    return {'mtime_ns': getTrustedMtime(mtime_ns), 'ncals': ncals}
+
+def loadCalIndex(local_cal_dir: str) -> dict:
+    # The tree is listed at every call (a single scandir), and a day folder is scanned again only when its mtime changed:
+    # the downloader moves complete days in place, and adding or removing a file changes the folder mtime.
+    # A file rewritten in place does not, so the cache fingerprints stat the files instead (summaryCache.getDirFingerprint).
+    # The index lives in its own folder, so that saving it does not touch the tree mtime
+    if not os.path.isdir(local_cal_dir):
+        return {'days': {}}
+    index_dir = getIndexDir(local_cal_dir)
+    index = {'days': {}}
+    if os.path.isfile(f"{index_dir}/index.json"):
+        with open(f"{index_dir}/index.json", "r") as _index:
+            index = json.load(_index)
+    days = {}
+    with os.scandir(local_cal_dir) as entries:
+        for entry in entries:
+            if isDayDir(entry.name) and entry.is_dir():
+                mtime_ns = entry.stat().st_mtime_ns
+                day_entry = index['days'].get(entry.name)
+                days[entry.name] = day_entry if day_entry and day_entry['mtime_ns'] == mtime_ns and 'ncals' in day_entry else scanDayDir(entry.path, mtime_ns)
+    days = dict(sorted(days.items()))
+    if days != index['days']:
+        os.makedirs(index_dir, exist_ok=True)
+        with open(f"{index_dir}/index.json.tmp", "w") as _index:
+            json.dump({'days': days}, _index)
+        os.replace(f"{index_dir}/index.json.tmp", f"{index_dir}/index.json")
+    return {'days': days}
+
+def getIndexedDays(local_cal_dir: str, start_date: date = None, end_date: date = None) -> list:
+    # Day names sort as their dates, so the window is found by bisection
+    days = list(loadCalIndex(local_cal_dir)['days'])
+    first = bisect_left(days, start_date.strftime('%Y%m%d')) if start_date else 0
+    last = bisect_right(days, end_date.strftime('%Y%m%d')) if end_date else len(days)
+    return [f"{local_cal_dir}/{day}" for day in days[first:last]]
+
+def getIndexedCalCounts(local_cal_dir: str) -> dict:
+    return {day: day_entry['ncals'] for day, day_entry in loadCalIndex(local_cal_dir)['days'].items()}
@@ -0,0 +1,132 @@
+from datetime import date
+import pandas as pd
+import numpy as np
+import json
+import io
+import os
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+from .report import ConsoleReport
+from .downloadCal import getDateFromDir
+from .summaryCache import getDirFingerprint
+from .calArchive import getArchiveDayPath, writeArchiveDay, readArchiveDay
+from .channelCube import cube_variables, cube_day_shape
+from .calIndex import getIndexedDays
+from .anomalyIndex import status_columns, getChannelStates
+from .calValidation import cal_columns, nchannels
+
+# Days parsed ahead of the consumer, per worker
+parse_lookahead = 4
+
+
+def buildTRBfileList(local_cal_dir: str) -> list:
+    # A single pass over the folder, each file going to its TRB by prefix
+    trbfiles = {f"TRB0{trb_idx}": [] for trb_idx in range(8)}
+    with os.scandir(local_cal_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.cal') and entry.name[:5] in trbfiles:
+                trbfiles[entry.name[:5]].append(entry.path)
+    return [sorted(files) for files in trbfiles.values()]
+
+def buildCalDict(local_cal_dir: str) -> dict:
+    trbfiles = buildTRBfileList(local_cal_dir)
+    trbs = [f"TRB0{trb_idx}" for trb_idx in range(8)]
+    trb_dicts = [dict(enumerate(tmptrbfiles)) for tmptrbfiles in trbfiles]
+    return dict(zip(trbs, trb_dicts))
+
+def readCalBlock(file_cal_dict: dict) -> np.ndarray:
+    cal_files = [file_cal_dict[trb_value][ladder_value] for trb_value in file_cal_dict for ladder_value in file_cal_dict[trb_value]]
+    block = np.empty((len(cal_files), nchannels, len(cal_columns)))
+    channel_rows = []
+    for cal_file in cal_files:
+        with open(cal_file, "rb") as _cal:
+            channel_rows += _cal.readlines()[:nchannels]
+    block.reshape(-1, len(cal_columns))[:] = pd.read_csv(io.BytesIO(b"".join(channel_rows)), header=None, names=cal_columns, dtype=np.float64).to_numpy()
+    return block
+
+def getLadderSummary(block: np.ndarray) -> dict:
+    means = block.mean(axis=1)
+    sigma = means[:, cal_columns.index('sigma')]
+    sigma_raw = means[:, cal_columns.index('sigma_raw')]
+    chsigma = block[:, :, cal_columns.index('sigma')]
+    bands = (chsigma >= 5).astype(np.intp) + (chsigma > 10)
+    ladder_bands = np.arange(len(block))[:, None]*3 + bands
+    counts = np.bincount(ladder_bands.ravel(), minlength=3*len(block)).reshape(len(block), 3)
+    return {'sigma': sigma, 'sigma_raw': sigma_raw, 'pedestal': means[:, cal_columns.index('ped')], 'cn': np.sqrt(sigma_raw**2 - sigma**2), 'ch5': counts[:, 0], 'ch510': counts[:, 1], 'ch10': counts[:, 2]}
+
+def getLadderDicts(summary: dict, trb_ladders: dict) -> tuple:
+    # Each TRB gets the ladders found in its folder, so that a missing file does not shift the others
+    bounds = np.cumsum([0] + list(trb_ladders.values()))
+    ladder_dicts = []
+    for variable in ['sigma', 'sigma_raw', 'pedestal', 'cn', 'ch5', 'ch510', 'ch10']:
+        values = np.asarray(summary[variable]).tolist()
+        ladder_dicts.append({trb: dict(enumerate(values[bounds[trb_idx]:bounds[trb_idx+1]])) for trb_idx, trb in enumerate(trb_ladders)})
+    return tuple(ladder_dicts)
+
+def readCalDict(file_cal_dict: dict) -> tuple:
+    block = readCalBlock(file_cal_dict)
+    return getLadderDicts(getLadderSummary(block), {trb: len(file_cal_dict[trb]) for trb in file_cal_dict}), block[:, :, cal_columns.index('sigma')].tolist()
+
+def getCalSourceDate(cal_source: str) -> date:
+    return getDateFromDir(cal_source[:-len('.npz')] if cal_source.endswith('.npz') else cal_source)
+
+def getCalDirList(local_cal_dir: str, start_date: date = None, end_date: date = None) -> list:
+    return getIndexedDays(local_cal_dir, start_date, end_date)
+
+def parseCalDay(cal_source: str) -> dict:
+    # A day is read either from its .cal folder or from its archive partition
+    block = readArchiveDay(cal_source) if cal_source.endswith('.npz') else readCalBlock(buildCalDict(cal_source))
+    day_summary = getLadderSummary(block)
+    day_summary['channels'] = block[:, :, [cal_columns.index(variable) for variable in cube_variables]].astype(np.float32)
+    day_summary['states'] = getChannelStates(block[:, :, cal_columns.index('sigma')], block[:, :, [cal_columns.index(flag) for flag in status_columns]])
+    day_summary['date'] = getCalSourceDate(cal_source)
+    return day_summary
+
+def iterCalDays(local_folders: list, jobs: int = 1):
+    if jobs > 1:
+        with Pool(jobs) as pool:
+            # Days are yielded in order, a new one being submitted as each is consumed: the workers never wait for a batch
+            # to finish, and at most parse_lookahead days per worker pile up ahead of a slower consumer
+            pending = deque()
+            for cal_folder in local_folders:
+                pending.append(pool.apply_async(parseCalDay, (cal_folder,)))
+                if len(pending) > parse_lookahead*jobs:
+                    yield pending.popleft().get()
+            while len(pending):
+                yield pending.popleft().get()
+    else:
+        yield from map(parseCalDay, local_folders)
+
+def ingestCalDay(cal_folder: str, archive_dir: str) -> int:
+    block = readCalBlock(buildCalDict(cal_folder))
+    if len(block) == cube_day_shape[0]:
+        writeArchiveDay(archive_dir, getDateFromDir(cal_folder), block)
+    return len(block)
+
+def ingestCalArchive(local_folders: list, archive_dir: str, report: ConsoleReport, jobs: int = 1) -> bool:
+    index = {}
+    if os.path.isfile(f"{archive_dir}/index.json"):
+        with open(f"{archive_dir}/index.json", "r") as _index:
+            index = json.load(_index)
+    new_folders = []
+    for cal_folder in local_folders:
+        fingerprint = getDirFingerprint(cal_folder)
+        if index.get(cal_folder[cal_folder.rfind('/')+1:]) != fingerprint or not os.path.isfile(getArchiveDayPath(archive_dir, getDateFromDir(cal_folder))):
+            new_folders.append((cal_folder, fingerprint))
+    if not len(new_folders):
+        return False
+    report.debug(f"Ingesting {len(new_folders)} calibration days into archive: [{archive_dir}]")
+    os.makedirs(archive_dir, exist_ok=True)
+    with report.timings.stage("archive_ingest", days=len(new_folders)), Pool(max(jobs, 1)) as pool:
+        nladders = list(report.progress(pool.imap(partial(ingestCalDay, archive_dir=archive_dir), [cal_folder for cal_folder, _ in new_folders]), len(new_folders)))
+    for (cal_folder, fingerprint), day_ladders in zip(new_folders, nladders):
+        # Days with missing ladder files are not archived, and tried again by the next ingestion
+        if day_ladders != cube_day_shape[0]:
+            report.error(f"Error: {day_ladders} calibration files in {cal_folder}, {cube_day_shape[0]} expected... day not archived")
+            continue
+        index[cal_folder[cal_folder.rfind('/')+1:]] = fingerprint
+    with open(f"{archive_dir}/index.json.tmp", "w") as _index:
+        json.dump(index, _index, indent=1, sort_keys=True)
+    os.replace(f"{archive_dir}/index.json.tmp", f"{archive_dir}/index.json")
+    return True
@@ -0,0 +1,60 @@
+import pandas as pd
+import numpy as np
+import zlib
+import io
+import os
+
+cal_columns = ["ch", "va", "chva", "ped", "sigma_raw", "sigma", "status", "status_2", "status_3"]
+nchannels = 384
+ntrailer_rows = 3
+
+
+def getFileChecksum(data: bytes) -> str:
+    # adler32, the default checksum of the XRootD servers, so that local and remote files compare without a download
+    return f"{zlib.adler32(data):08x}"
+
+def checkCalRows(cal_file: str, data: bytes) -> str:
+    if not data.endswith(b"\n"):
+        return f"{cal_file}: truncated last row"
+    nrows = data.count(b"\n")
+    if nrows < nchannels + ntrailer_rows:
+        return f"{cal_file}: {nrows} rows, {nchannels} channels plus {ntrailer_rows} trailer rows expected"
+    return ""
+
+def checkCalBlock(block: np.ndarray, cal_files: list) -> list:
+    # Numeric sanity of each ladder: finite values, channels in order, non-negative noise and flags
+    bad = ~np.isfinite(block).all(axis=(1, 2))
+    bad |= (block[:, :, cal_columns.index('ch')] != np.arange(nchannels)).any(axis=1)
+    bad |= (block[:, :, cal_columns.index('sigma_raw'):] < 0).any(axis=(1, 2))
+    return [f"{cal_files[idx]}: channel values out of range" for idx in np.nonzero(bad)[0]]
+
+def validateCalDay(day_dir: str, nladders: int = 192) -> tuple:
+    # Checksums of the .cal files of the folder, and what is wrong with them, if anything
+    checksums = {}
+    errors = []
+    channel_rows = []
+    with os.scandir(day_dir) as entries:
+        cal_files = sorted(entry.name for entry in entries if entry.name.endswith('.cal'))
+    if len(cal_files) != nladders:
+        errors.append(f"{len(cal_files)} calibration files, {nladders} expected")
+    for cal_file in cal_files:
+        with open(f"{day_dir}/{cal_file}", "rb") as _cal:
+            data = _cal.read()
+        checksums[cal_file] = getFileChecksum(data)
+        error = checkCalRows(cal_file, data)
+        if error:
+            errors.append(error)
+            continue
+        rows = data.split(b"\n", nchannels)[:nchannels]
+        if any(row.count(b",") != len(cal_columns)-1 for row in rows):
+            errors.append(f"{cal_file}: channel rows without {len(cal_columns)} columns")
+            continue
+        channel_rows += rows
+    if len(errors):
+        return (checksums, errors)
+    # Same parser as the analysis, so that whatever it would choke on is caught here
+    try:
+        block = pd.read_csv(io.BytesIO(b"\n".join(channel_rows)), header=None, names=cal_columns, dtype=np.float64).to_numpy()
+    except ValueError:
+        return (checksums, ["non-numeric channel rows"])
+    return (checksums, checkCalBlock(block.reshape(len(cal_files), nchannels, len(cal_columns)), cal_files))
@@ -0,0 +1,48 @@
+import numpy as np
+import os
+
+cube_dir_name = ".cube"
+cube_variables = ['ped', 'sigma_raw', 'sigma']
+cube_day_shape = (192, 384, len(cube_variables))
+cube_append_days = 32
+
+
+def getCubeDir(local_cal_dir: str) -> str:
+    return f"{local_cal_dir}/{cube_dir_name}"
+
+def loadCubeIndex(local_cal_dir: str) -> dict:
+    cube_dir = getCubeDir(local_cal_dir)
+    if not os.path.isfile(f"{cube_dir}/dates.npy"):
+        return {}
+    return {cal_date: row for row, cal_date in enumerate(np.load(f"{cube_dir}/dates.npy").astype(object))}
+
+def openChannelCube(local_cal_dir: str, mode: str = 'r') -> np.memmap:
+    # Rows beyond the date index belong to an interrupted append and are ignored
+    nrows = len(loadCubeIndex(local_cal_dir))
+    if not nrows:
+        return np.empty((0,) + cube_day_shape, dtype=np.float32)
+    return np.memmap(f"{getCubeDir(local_cal_dir)}/channels.f32", dtype=np.float32, mode=mode, shape=(nrows,) + cube_day_shape)
+
+def appendCubeDays(local_cal_dir: str, cube_days: dict):
+    cube_dir = getCubeDir(local_cal_dir)
+    if not os.path.isdir(cube_dir):
+        os.mkdir(cube_dir)
+    index = loadCubeIndex(local_cal_dir)
+    # Days already in the cube are overwritten in place, new ones are appended
+    known_days = [cal_date for cal_date in cube_days if cal_date in index]
+    if len(known_days):
+        cube = openChannelCube(local_cal_dir, mode='r+')
+        for cal_date in known_days:
+            cube[index[cal_date]] = cube_days[cal_date]
+        cube.flush()
+        del cube
+    new_days = [cal_date for cal_date in cube_days if cal_date not in index]
+    if len(new_days):
+        row_bytes = int(np.prod(cube_day_shape))*np.dtype(np.float32).itemsize
+        with open(f"{cube_dir}/channels.f32", "ab") as _cube:
+            _cube.truncate(len(index)*row_bytes)
+            for cal_date in new_days:
+                _cube.write(np.ascontiguousarray(cube_days[cal_date], dtype=np.float32).tobytes())
+        dates = sorted(index, key=index.get) + new_days
+        np.save(f"{cube_dir}/dates.tmp.npy", np.array(dates, dtype='datetime64[D]'))
+        os.replace(f"{cube_dir}/dates.tmp.npy", f"{cube_dir}/dates.npy")
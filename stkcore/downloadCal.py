@@ -0,0 +1,329 @@
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+import json
+import re
+import time
+import os
+from .report import ConsoleReport, BufferedReport
+from .calIndex import getIndexedCalCounts
+from .calValidation import validateCalDay
+from .transport import TransportError, getTransport
+
+journal_name = ".download_journal"
+staging_name = ".staging"
+manifest_name = ".remote_manifest.json"
+raw_policies = ['latest', 'earliest']
+
+
+def getdate(file: str) -> date:
+    year = int(file[file.rfind('/')+1:file.rfind('/')+5])
+    month = int(file[file.rfind('/')+5:file.rfind('/')+7])
+    day = int(file[file.rfind('/')+7:])
+    return date(year, month, day)
+
+def getdate_str(file_date: date) -> str:
+    year = str(file_date.year)
+    month = str(f"0{file_date.month}") if file_date.month < 10 else str(file_date.month)
+    day = str(f"0{file_date.day}") if file_date.day < 10 else str(file_date.day)
+    return f"{year}{month}{day}"
+
+def getDateFromDir(local_cal_dir: str) -> date:
+    year = int(local_cal_dir[local_cal_dir.rfind('/')+1:local_cal_dir.rfind('/')+5])
+    month = int(local_cal_dir[local_cal_dir.rfind('/')+5:local_cal_dir.rfind('/')+7])
+    day = int(local_cal_dir[local_cal_dir.rfind('/')+7:])
+    return date(year, month, day)
+
+def checkLocalDir(local_dir: str) -> bool:
+    status = True
+    if (os.path.exists(local_dir)):
+        status = False
+    else:
+        os.mkdir(local_dir)
+    return status
+
+def listXrootDdir(remote_dir: str, config: dict, report: ConsoleReport) -> list:
+    transport = getTransport(config)
+    with report.timings.stage("ls", kind=transport.name, path=remote_dir) as counters:
+        entries = transport.ls(remote_dir, report)
+        counters['files'] = len(entries)
+    return entries
+
+def listDayRawDirs(day_dir: str, config: dict, report: ConsoleReport) -> list:
+    return [tmpdst2 for tmpdst2 in listXrootDdir(day_dir, config, report) if "RAW" in tmpdst2]
+
+def listRawCalFiles(raw_dir: str, config: dict, report: ConsoleReport) -> list:
+    # Get stage 2 dirs --> /FM/FlightData/CAL/STK/DayOfCalibration/STK_CALIB_RAW_***/CalibrationFiles
+    return sorted(os.path.basename(file) for file in listXrootDdir(raw_dir, config, report) if file.endswith('.cal'))
+
+def getRawOrder(raw_dir: str) -> list:
+    # Natural order of the RAW folders: STK_CALIB_RAW_9 comes before STK_CALIB_RAW_10
+    return [(len(part.lstrip('0')), part.lstrip('0')) if part.isdigit() else (0, part) for part in re.split(r'(\d+)', os.path.basename(raw_dir.rstrip('/')))]
+
+def getStaleRawDirs(entry: dict, raw_dirs: list, nladders: int = 192) -> list:
+    # Complete RAW folders are never listed again, partial ones may still be filling up
+    raw_counts = entry.get('raw_counts') or {}
+    return [raw_dir for raw_dir in raw_dirs if raw_counts.get(raw_dir) != nladders]
+
+def updateDayEntry(day_dir: str, entry: dict, raw_dirs: list, raw_listings: dict) -> dict:
+    raw_counts = entry.get('raw_counts') or {}
+    raw_counts = {raw_dir: len(raw_listings[raw_dir]) if raw_dir in raw_listings else raw_counts[raw_dir] for raw_dir in raw_dirs}
+    return {'day_dir': day_dir, 'raw_dirs': raw_dirs, 'raw_counts': raw_counts, 'policy': None, 'cal_dir': entry.get('cal_dir', ""), 'cal_files': entry.get('cal_files') or []}
+
+def selectCalDir(entry: dict, policy: str, raw_listings: dict, nladders: int = 192) -> dict:
+    # The decision is kept in the manifest, and taken again from the cached RAW counts only when the policy changes
+    if 'raw_counts' not in entry or entry['policy'] == policy:
+        return entry
+    complete = sorted([raw_dir for raw_dir, ncals in entry['raw_counts'].items() if ncals == nladders], key=getRawOrder)
+    cal_dir = (complete[0] if policy == 'earliest' else complete[-1]) if len(complete) else ""
+    if cal_dir in raw_listings:
+        cal_files = raw_listings[cal_dir]
+    else:
+        # Listed again at download time when it is not known
+        cal_files = entry['cal_files'] if cal_dir == entry['cal_dir'] else []
+    return dict(entry, policy=policy, cal_dir=cal_dir, cal_files=cal_files)
+
+def loadRemoteManifest(local_dir: str) -> dict:
+    manifest = {}
+    if os.path.isfile(f"{local_dir}/{manifest_name}"):
+        with open(f"{local_dir}/{manifest_name}", "r") as _manifest:
+            manifest = json.load(_manifest)
+    # Days downloaded before the manifest existed are known from the download journal
+    for day_str, entry in loadDownloadJournal(local_dir).items():
+        if day_str not in manifest:
+            manifest[day_str] = {'day_dir': entry['remote_dir'][:entry['remote_dir'].rstrip('/').rfind('/')], 'raw_dirs': None, 'cal_dir': entry['remote_dir']}
+    return manifest
+
+def saveRemoteManifest(local_dir: str, manifest: dict):
+    with open(f"{local_dir}/{manifest_name}.tmp", "w") as _manifest:
+        json.dump(manifest, _manifest, indent=1, sort_keys=True)
+    os.replace(f"{local_dir}/{manifest_name}.tmp", f"{local_dir}/{manifest_name}")
+
+def parseXrootDfiles(config: dict, local_dir: str, report: ConsoleReport) -> dict:
+
+    # Crate output data file list
+    years = []
+    filedirs = []
+    dates = []
+    counters = []
+    nladders = 192
+    policy = config.get('raw_policy', 'latest')
+    if policy not in raw_policies:
+        raise ValueError(f"Unknown raw_policy [{policy}], expected one of: {', '.join(raw_policies)}")
+    start = time.perf_counter()
+
+    # Days already in the local manifest are not probed again, apart from the most recent ones
+    # and those without a complete calibration, which are checked for new or replaced RAW folders
+    manifest = loadRemoteManifest(local_dir)
+    high_water = max(manifest) if len(manifest) else ""
+    recheck_from = getdate_str(getdate(f"/{high_water}") - timedelta(days=config.get('recheck_days', 7))) if high_water else ""
+
+    # Get stage 0 dirs --> /FM/FlightData/CAL/STK/
+    dataDirs = listXrootDdir(config['cal_XRDFS_path'], config, report)
+
+    # Get stage 1 dirs --> /FM/FlightData/CAL/STK/DayOfCalibration/
+    day_dirs = {}
+    for dir_st1 in dataDirs:
+        if "20" in dir_st1:
+
+            # Date filtering
+            tmpdate = getdate(dir_st1)
+            if tmpdate < config['start_date'] or tmpdate > config['end_date']:
+                continue
+            if tmpdate.year not in years:
+                years.append(tmpdate.year)
+                counters.append(0)
+            day_dirs[tmpdate] = dir_st1
+
+    # Days are probed concurrently: first the RAW folders of each day, then the calibration files of all their new or partial RAW folders at once
+    probe_days = [tmpdate for tmpdate in day_dirs if not manifest.get(getdate_str(tmpdate), {}).get('cal_dir') or getdate_str(tmpdate) >= recheck_from]
+    with ThreadPoolExecutor(max_workers=config.get('xrdfs_jobs', 1)) as pool:
+        day_raw_dirs = dict(zip(probe_days, report.progress(pool.map(lambda tmpdate: listDayRawDirs(day_dirs[tmpdate], config, report), probe_days), len(probe_days))))
+        stale_raw_dirs = [raw_dir for tmpdate in probe_days for raw_dir in getStaleRawDirs(manifest.get(getdate_str(tmpdate), {}), day_raw_dirs[tmpdate], nladders)]
+        raw_listings = dict(zip(stale_raw_dirs, report.progress(pool.map(lambda raw_dir: listRawCalFiles(raw_dir, config, report), stale_raw_dirs), len(stale_raw_dirs))))
+
+    for tmpdate in day_dirs:
+        entry = manifest.get(getdate_str(tmpdate), {})
+        if tmpdate in day_raw_dirs:
+            entry = updateDayEntry(day_dirs[tmpdate], entry, day_raw_dirs[tmpdate], raw_listings)
+        entry = selectCalDir(entry, policy, raw_listings, nladders)
+        manifest[getdate_str(tmpdate)] = entry
+        if entry['cal_dir']:
+            dates.append(tmpdate)
+            filedirs.append(entry['cal_dir'])
+            counters[years.index(tmpdate.year)] += nladders
+    if os.path.isdir(local_dir):
+        saveRemoteManifest(local_dir, manifest)
+    report.timings.record("stage", "discovery", time.perf_counter() - start, days=len(dates), files=sum(counters))
+
+    report.debug(f"{sum(counters)} data files have been read...")
+    for year_idx, year in enumerate(years):
+        report.debug(f"{counters[year_idx]} data files found in {year} folder")
+    return dict(zip(dates, filedirs))
+    
+def downloadSingleFile(file: str, file_date: date, local_dir: str, config: dict, report: ConsoleReport):
+    transport = getTransport(config)
+    with report.timings.stage("copy", kind=transport.name, path=file):
+        transport.copyFile(file, f"{local_dir}/{getdate_str(file_date)}", report)
+
+def downloadDayFiles(remote_folder: str, cal_files: list, day_dir: str, config: dict, report: ConsoleReport):
+    # Only the calibration files are fetched, with a single multi-source copy, straight into the day folder
+    transport = getTransport(config)
+    with report.timings.stage("copy_files", kind=transport.name, path=remote_folder, files=len(cal_files)):
+        transport.copyFiles([f"{remote_folder.rstrip('/')}/{cal_file}" for cal_file in cal_files], day_dir, report)
+
+def loadDownloadJournal(local_dir: str) -> dict:
+    journal = {}
+    if os.path.isfile(f"{local_dir}/{journal_name}"):
+        with open(f"{local_dir}/{journal_name}", "r") as _journal:
+            for line in _journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line of an interrupted run
+                    continue
+                journal[entry['date']] = entry
+    return journal
+
+def appendDownloadJournal(local_dir: str, entry: dict):
+    with open(f"{local_dir}/{journal_name}", "a") as _journal:
+        _journal.write(f"{json.dumps(entry)}\n")
+
+def getRemoteChecksums(remote_folder: str, cal_files: list, config: dict, report: ConsoleReport) -> dict:
+    transport = getTransport(config)
+    with report.timings.stage("checksum", kind=transport.name, path=remote_folder, files=len(cal_files)), ThreadPoolExecutor(max_workers=config.get('xrdfs_jobs', 1)) as pool:
+        return dict(zip(cal_files, pool.map(lambda cal_file: transport.checksum(f"{remote_folder.rstrip('/')}/{cal_file}", report), cal_files)))
+
+def reuseLocalFiles(remote_checksums: dict, known_checksums: dict, day_dir: str, day_staging_dir: str) -> list:
+    # Files whose remote checksum matches the local copy are linked into the staging folder, the others are returned to be downloaded
+    missing = []
+    for cal_file, checksum in remote_checksums.items():
+        if known_checksums.get(cal_file) != checksum or not os.path.isfile(f"{day_dir}/{cal_file}"):
+            missing.append(cal_file)
+            continue
+        try:
+            os.link(f"{day_dir}/{cal_file}", f"{day_staging_dir}/{cal_file}")
+        except OSError:
+            shutil.copy2(f"{day_dir}/{cal_file}", f"{day_staging_dir}/{cal_file}")
+    return missing
+
+def downloadDay(remote_folder: str, cal_files: list, folder_date: date, local_dir: str, config: dict, report: ConsoleReport, known_checksums: dict = None) -> dict:
+    known_checksums = known_checksums if known_checksums is not None else {}
+    day_dir = f"{local_dir}/{getdate_str(folder_date)}"
+    day_staging_dir = f"{local_dir}/{staging_name}/{getdate_str(folder_date)}"
+    retries = config.get('xrdcp_retries', 3)
+    remote_checksums = {}
+    start = time.perf_counter()
+    for attempt in range(retries+1):
+        if attempt:
+            time.sleep(config.get('xrdcp_backoff', 1.)*pow(2, attempt-1))
+        shutil.rmtree(day_staging_dir, ignore_errors=True)
+        os.makedirs(day_staging_dir)
+        try:
+            # Days discovered before the file names were kept in the manifest are listed again
+            if not cal_files:
+                cal_files = sorted(os.path.basename(file) for file in listXrootDdir(remote_folder, config, report) if file.endswith('.cal'))
+            missing = cal_files
+            # A calibration re-published under a new RAW folder only costs the files that actually changed
+            if len(known_checksums):
+                try:
+                    remote_checksums = remote_checksums or getRemoteChecksums(remote_folder, cal_files, config, report)
+                    missing = reuseLocalFiles(remote_checksums, known_checksums, day_dir, day_staging_dir)
+                except TransportError as error:
+                    report.debug(f"No remote checksums for {remote_folder}, downloading it again: {error}")
+            if len(missing):
+                downloadDayFiles(remote_folder, missing, day_staging_dir, config, report)
+        except TransportError as error:
+            report.error(f"Error downloading {remote_folder} (attempt {attempt+1}/{retries+1}): {error}")
+            continue
+        nbytes = sum(os.path.getsize(f"{day_staging_dir}/{cal}") for cal in missing)
+        with report.timings.stage("validate", date=getdate_str(folder_date), files=len(cal_files)):
+            checksums, invalid = validateCalDay(day_staging_dir)
+        if len(invalid):
+            report.error(f"Error: invalid calibration downloaded from {remote_folder} (attempt {attempt+1}/{retries+1}): {'; '.join(invalid[:3])}")
+            continue
+        # The day only shows up in the local dir once it is complete
+        if os.path.isdir(day_dir):
+            shutil.rmtree(day_dir)
+        os.replace(day_staging_dir, day_dir)
+        report.timings.record("stage", "download_day", time.perf_counter() - start, date=getdate_str(folder_date), files=len(missing), bytes=nbytes, retries=attempt)
+        return {'date': getdate_str(folder_date), 'remote_dir': remote_folder, 'files': len(missing), 'bytes': nbytes, 'checksums': checksums}
+    shutil.rmtree(day_staging_dir, ignore_errors=True)
+    report.timings.record("stage", "download_day", time.perf_counter() - start, date=getdate_str(folder_date), retries=retries, failed=True)
+    return {'date': getdate_str(folder_date)}
+
+def syncDay(remote_folder: str, cal_files: list, folder_date: date, local_dir: str, config: dict, report: ConsoleReport, entry: dict, complete: bool) -> dict:
+    # Complete days without checksums, downloaded before they were recorded, are validated in place first:
+    # they are kept if still published under the same RAW folder, and their checksums spare the files unchanged otherwise
+    known_checksums = entry.get('checksums', {}) if complete else {}
+    if complete and not len(known_checksums):
+        with report.timings.stage("validate", date=getdate_str(folder_date), files=192):
+            checksums, errors = validateCalDay(f"{local_dir}/{getdate_str(folder_date)}")
+        if len(errors):
+            report.info(f"Invalid calibration in {getdate_str(folder_date)}: {'; '.join(errors[:3])}... downloading it again")
+        else:
+            known_checksums = checksums
+            # Complete day downloaded before the journal existed
+            if entry.get('remote_dir', remote_folder) == remote_folder:
+                return {'date': getdate_str(folder_date), 'remote_dir': remote_folder, 'files': 0, 'bytes': 0, 'checksums': checksums}
+    return downloadDay(remote_folder, cal_files, folder_date, local_dir, config, report, known_checksums)
+
+def getManifestCalFiles(manifest: dict, file_date: date, remote_folder: str) -> list:
+    entry = manifest.get(getdate_str(file_date), {})
+    return (entry.get('cal_files') or []) if entry.get('cal_dir') == remote_folder else []
+
+def downloadFiles(file_dict: dict, local_dir: str, config: dict, report: ConsoleReport) -> bool:
+    journal = loadDownloadJournal(local_dir)
+    manifest = loadRemoteManifest(local_dir)
+    cal_counts = getIndexedCalCounts(local_dir)
+    pending = {}
+    for tmpdate in file_dict:
+        entry = journal.get(getdate_str(tmpdate), {})
+        # Days are skipped only once complete, validated, and still published under the same RAW folder
+        if cal_counts.get(getdate_str(tmpdate), 0) != 192 or 'checksums' not in entry or entry['remote_dir'] != file_dict[tmpdate]:
+            pending[tmpdate] = file_dict[tmpdate]
+    if len(pending) < len(file_dict):
+        report.info(f"{len(file_dict)-len(pending)} calibration days already downloaded... skipping")
+
+    status = True
+    nfiles = 0
+    nbytes = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config.get('xrdcp_jobs', 1)) as pool:
+        # Each day is validated by its worker as soon as it is downloaded, while the other workers keep downloading.
+        # Workers report to their own buffer, shown from this thread once their day is done
+        day_reports = {tmpdate: BufferedReport(report) for tmpdate in pending}
+        downloads = {pool.submit(syncDay, pending[tmpdate], getManifestCalFiles(manifest, tmpdate, pending[tmpdate]), tmpdate, local_dir, config, day_reports[tmpdate],
+            journal.get(getdate_str(tmpdate), {}), cal_counts.get(getdate_str(tmpdate), 0) == 192): day_reports[tmpdate] for tmpdate in pending}
+        for download in report.progress(as_completed(downloads), len(downloads)):
+            entry = download.result()
+            downloads[download].flush(report)
+            if 'checksums' in entry:
+                appendDownloadJournal(local_dir, entry)
+                nfiles += entry['files']
+                nbytes += entry['bytes']
+            else:
+                status = False
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    report.timings.record("stage", "download", elapsed, days=len(pending), files=nfiles, bytes=nbytes)
+    if len(pending):
+        report.info(f"{nfiles} files ({nbytes/1e6:.1f} MB) downloaded in {elapsed:.1f} s: {nfiles/elapsed:.1f} files/s, {nbytes/1e6/elapsed:.2f} MB/s")
+    shutil.rmtree(f"{local_dir}/{staging_name}", ignore_errors=True)
+    if not status:
+        report.error("Error: some calibration days could not be downloaded... run again to resume")
+    return status
+
+def checkDownloadedFiles(local_dir: str, report: ConsoleReport, start_date: date = None) -> bool:
+    status = True
+    start = time.perf_counter()
+    cal_counts = getIndexedCalCounts(local_dir)
+    day_cals = list(cal_counts)
+    for day_cal in report.progress(day_cals, len(day_cals)):
+        if start_date and day_cal < getdate_str(start_date):
+            continue
+        if cal_counts[day_cal] != 192:
+            status = False
+            report.error(f"Error: check calibration files in {day_cal}")
+            break
+    report.timings.record("stage", "check", time.perf_counter() - start, days=len(day_cals))
+    return status
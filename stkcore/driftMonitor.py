@@ -0,0 +1,110 @@
+import numpy as np
+import json
+import os
+
+drift_dir_name = ".drift"
+drift_variables = ['sigma_values', 'pedestal_values', 'cn_values']
+drift_settings = {'window': 30, 'min_days': 20, 'z_threshold': 5., 'cusum_drift': 0.5, 'cusum_threshold': 10.}
+nladders_trb = 24
+
+
+def getDriftDir(local_cal_dir: str) -> str:
+    return f"{local_cal_dir}/{drift_dir_name}"
+
+def newDriftState(settings: dict) -> dict:
+    # Values are allocated with the first day, once the number of ladders is known
+    return dict(settings, last_date="", count=0, position=0, values=None, sums=None, sumsq=None, cusum_pos=None, cusum_neg=None)
+
+def loadDriftState(local_cal_dir: str, settings: dict) -> dict:
+    if not os.path.isfile(f"{getDriftDir(local_cal_dir)}/state.npz"):
+        return newDriftState(settings)
+    with np.load(f"{getDriftDir(local_cal_dir)}/state.npz") as stored:
+        state = {key: stored[key] for key in stored.files}
+    state['last_date'] = str(state['last_date'])
+    for key in ['count', 'position', 'window', 'min_days']:
+        state[key] = int(state[key])
+    for key in ['z_threshold', 'cusum_drift', 'cusum_threshold']:
+        state[key] = float(state[key])
+    # A state built with other settings is started again
+    if any(state[key] != value for key, value in settings.items()):
+        return newDriftState(settings)
+    return state
+
+def saveDriftState(local_cal_dir: str, state: dict):
+    drift_dir = getDriftDir(local_cal_dir)
+    os.makedirs(drift_dir, exist_ok=True)
+    np.savez(f"{drift_dir}/state.tmp.npz", **state)
+    os.replace(f"{drift_dir}/state.tmp.npz", f"{drift_dir}/state.npz")
+
+def initDriftMonitor(local_cal_dir: str, settings: dict = drift_settings) -> dict:
+    return {'local_cal_dir': local_cal_dir, 'state': loadDriftState(local_cal_dir, settings), 'alerts': [], 'new_days': 0}
+
+def getRollingStats(state: dict) -> tuple:
+    nvalues = min(state['count'], state['window'])
+    mean = state['sums']/nvalues
+    std = np.sqrt(np.maximum(state['sumsq']/nvalues - mean**2, 0.))
+    return (mean, std)
+
+def getDriftAlerts(cal_date: str, values: np.ndarray, z: np.ndarray, mean: np.ndarray, std: np.ndarray, kind: str, selection: np.ndarray) -> list:
+    alerts = []
+    for var_idx, ladder_idx in zip(*np.nonzero(selection)):
+        alerts.append({'date': cal_date, 'kind': kind, 'variable': drift_variables[var_idx][:-len('_values')], 'trb': int(ladder_idx//nladders_trb), 'ladder': int(ladder_idx % nladders_trb), 'ladder_idx': int(ladder_idx),
+            'value': round(float(values[var_idx, ladder_idx]), 4), 'mean': round(float(mean[var_idx, ladder_idx]), 4), 'std': round(float(std[var_idx, ladder_idx]), 4), 'z': round(float(z[var_idx, ladder_idx]), 2)})
+    return alerts
+
+def fillDriftMonitor(monitor: dict, day_values: dict):
+    # Each new day costs O(ladders): it is compared to the trailing window, then replaces the oldest day of the window.
+    # Days up to the last one already processed, in this or in a previous run, are skipped
+    state = monitor['state']
+    cal_date = day_values['date'].strftime('%Y%m%d')
+    if cal_date <= state['last_date']:
+        return
+    values = np.array([day_values[variable] for variable in drift_variables], dtype=np.float64)
+    if state['values'] is None:
+        state['values'] = np.zeros((state['window'],) + values.shape)
+        for key in ['sums', 'sumsq', 'cusum_pos', 'cusum_neg']:
+            state[key] = np.zeros(values.shape)
+
+    if state['count'] >= state['min_days']:
+        mean, std = getRollingStats(state)
+        z = (values - mean)/np.maximum(std, 1e-6*np.maximum(np.abs(mean), 1.))
+        # Two-sided CUSUM on the standardized deviation, restarted once a change point is flagged
+        state['cusum_pos'] = np.maximum(0., state['cusum_pos'] + z - state['cusum_drift'])
+        state['cusum_neg'] = np.maximum(0., state['cusum_neg'] - z - state['cusum_drift'])
+        change_points = (state['cusum_pos'] > state['cusum_threshold']) | (state['cusum_neg'] > state['cusum_threshold'])
+        monitor['alerts'] += getDriftAlerts(cal_date, values, z, mean, std, 'deviation', np.abs(z) > state['z_threshold'])
+        monitor['alerts'] += getDriftAlerts(cal_date, values, z, mean, std, 'change_point', change_points)
+        state['cusum_pos'][change_points] = 0.
+        state['cusum_neg'][change_points] = 0.
+
+    position = state['position']
+    if state['count'] >= state['window']:
+        state['sums'] -= state['values'][position]
+        state['sumsq'] -= state['values'][position]**2
+    state['values'][position] = values
+    state['sums'] += values
+    state['sumsq'] += values**2
+    state['position'] = (position + 1) % state['window']
+    if state['position'] == 0:
+        # Once per window, the running sums are taken again from the window, so that rounding errors do not pile up
+        state['sums'] = state['values'].sum(axis=0)
+        state['sumsq'] = (state['values']**2).sum(axis=0)
+    state['count'] += 1
+    state['last_date'] = cal_date
+    monitor['new_days'] += 1
+
+def finalizeDriftMonitor(monitor: dict) -> list:
+    if not monitor['new_days']:
+        return []
+    saveDriftState(monitor['local_cal_dir'], monitor['state'])
+    with open(f"{getDriftDir(monitor['local_cal_dir'])}/alerts.jsonl", "a") as _alerts:
+        for alert in monitor['alerts']:
+            _alerts.write(f"{json.dumps(alert)}\n")
+    return monitor['alerts']
+
+def loadDriftAlerts(local_cal_dir: str) -> list:
+    alerts = []
+    if os.path.isfile(f"{getDriftDir(local_cal_dir)}/alerts.jsonl"):
+        with open(f"{getDriftDir(local_cal_dir)}/alerts.jsonl", "r") as _alerts:
+            alerts = [json.loads(line) for line in _alerts if line.strip()]
+    return alerts
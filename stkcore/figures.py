@@ -0,0 +1,82 @@
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import pandas as pd
+from .timeEvolution import getLadderArray
+
+channel_fractions = {
+    'chfrac_s5': ('ch frac sigma < 5', 'cornflowerblue'),
+    'chfrac_s510': ('ch frac 5 < sigma < 10', 'sandybrown'),
+    'chfrac_s10': ('ch frac sigma > 10', 'firebrick')
+}
+
+
+def setDateAxis(fig: plt.Figure, ax: plt.Axes, xaxis_interval: int):
+    if xaxis_interval:
+        ax.xaxis.set_major_locator(mdates.MonthLocator(interval=xaxis_interval))
+        if xaxis_interval<=3:
+            ax.xaxis.set_minor_locator(mdates.DayLocator())
+        else:
+            ax.xaxis.set_minor_locator(mdates.MonthLocator())
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
+    fig.autofmt_xdate()
+
+def buildEvFigure(time_evolution: dict, plt_variable: str, plt_variable_label: str, plt_color: str, xaxis_interval: int, yaxis_title: str = "") -> plt.Figure:
+    fig, ax = plt.subplots(clear=True)
+    ax.plot(time_evolution['date'], time_evolution[plt_variable], label=plt_variable_label, color=plt_color)
+    setDateAxis(fig, ax, xaxis_interval)
+    if yaxis_title:
+        ax.set_ylabel(yaxis_title, fontsize=10)
+    return fig
+
+def buildChSigmaEv(time_evolution: dict, xaxis_interval: int, fractions: list = list(channel_fractions), legend: bool = False) -> plt.Figure:
+    fig, ax = plt.subplots(clear=True)
+    for fraction in fractions:
+        ax.plot(time_evolution['date'], time_evolution[fraction], label=channel_fractions[fraction][0], color=channel_fractions[fraction][1])
+    setDateAxis(fig, ax, xaxis_interval)
+    if legend:
+        ax.legend(bbox_to_anchor=(1.05, 0.5), loc='center left')
+    return fig
+
+def buildVariableDistribution(time_evolution: dict, plt_variable: str, bins: int, xrange: tuple) -> plt.Figure:
+    fig, ax = plt.subplots(clear=True)
+    ax.hist(time_evolution[plt_variable], bins, density=True, range=xrange)
+    return fig
+
+def buildLadderEvFigure(time_evolution: dict, metric: str, xaxis_interval: int, trbs: list = None, ladders: list = None, group: str = 'trb', yaxis_title: str = "") -> plt.Figure:
+    # One curve per TRB (mean of the selected ladders), per selected ladder, or a single mean of the whole selection
+    values = getLadderArray(time_evolution, metric, trbs, ladders)
+    trbs = trbs if trbs else list(range(values.shape[1]))
+    ladders = ladders if ladders else list(range(values.shape[2]))
+    fig, ax = plt.subplots(clear=True)
+    if group == 'ladder':
+        for trb_idx, trb in enumerate(trbs):
+            for ladder_idx, ladder in enumerate(ladders):
+                ax.plot(time_evolution['date'], values[:, trb_idx, ladder_idx], label=f"TRB0{trb} ladder {ladder}")
+    elif group == 'trb':
+        for trb_idx, trb in enumerate(trbs):
+            ax.plot(time_evolution['date'], values[:, trb_idx].mean(axis=1), label=f"TRB0{trb}")
+    else:
+        ax.plot(time_evolution['date'], values.mean(axis=(1, 2)), label=metric)
+    setDateAxis(fig, ax, xaxis_interval)
+    ax.set_ylabel(yaxis_title if yaxis_title else metric, fontsize=10)
+    if group != 'all' and len(ax.lines) <= 24:
+        ax.legend(bbox_to_anchor=(1.05, 0.5), loc='center left', fontsize=7)
+    return fig
+
+def buildWindowDistribution(window_evolutions: dict, plt_variable: str, bins: int, xrange: tuple = None) -> plt.Figure:
+    # One normalized histogram per window, on the same bins
+    fig, ax = plt.subplots(clear=True)
+    for label, time_evolution in window_evolutions.items():
+        if len(time_evolution[plt_variable]):
+            ax.hist(time_evolution[plt_variable], bins, density=True, range=xrange, histtype='step', label=label)
+    ax.set_xlabel(plt_variable, fontsize=10)
+    ax.legend()
+    return fig
+
+def buildWindowSummaryFigure(window_summary: pd.DataFrame, plt_variable: str, plt_color: str = "firebrick") -> plt.Figure:
+    # Mean and standard deviation of the daily values in each window
+    fig, ax = plt.subplots(clear=True)
+    ax.errorbar(window_summary['window'], window_summary[f"{plt_variable}_mean"], yerr=window_summary[f"{plt_variable}_std"], fmt='o', color=plt_color)
+    ax.set_ylabel(plt_variable, fontsize=10)
+    fig.autofmt_xdate()
+    return fig
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from datetime import datetime
+import threading
+import cProfile
+import pstats
+import json
+import time
+import os
+
+profiled_stages = ['parse', 'root_fill', 'root_write']
+
+
+class StageTimings:
+    # Wall time and counters (bytes, files, retries) of each stage and subprocess call, as JSON lines.
+    # Downloads record from worker threads, hence the lock
+    def __init__(self, out_filename: str = "", profile_dir: str = ""):
+        self.out_filename = out_filename
+        self.profile_dir = profile_dir
+        self.run = datetime.now().isoformat(timespec='seconds')
+        self.records = []
+        self.spans = {}
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, name: str, seconds: float, **counters):
+        entry = {'run': self.run, 'kind': kind, 'name': name, 'seconds': round(seconds, 4), **counters}
+        with self.lock:
+            self.records.append(entry)
+            if self.out_filename:
+                with open(self.out_filename, "a") as _out:
+                    _out.write(f"{json.dumps(entry)}\n")
+
+    @contextmanager
+    def profiled(self, name: str):
+        if not self.profile_dir or name not in profiled_stages:
+            yield
+            return
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    @contextmanager
+    def stage(self, name: str, kind: str = "stage", **counters):
+        # Callers update the yielded counters while the stage runs
+        start = time.perf_counter()
+        try:
+            with self.profiled(name):
+                yield counters
+        except Exception:
+            counters['failed'] = True
+            raise
+        finally:
+            self.record(kind, name, time.perf_counter() - start, **counters)
+
+    @contextmanager
+    def span(self, name: str, **counters):
+        # Stages interleaved with others, as the parsing of streamed days, are summed up and recorded on close
+        start = time.perf_counter()
+        try:
+            with self.profiled(name):
+                yield
+        finally:
+            with self.lock:
+                total = self.spans.setdefault(name, {'seconds': 0.})
+                total['seconds'] += time.perf_counter() - start
+                for key, value in counters.items():
+                    total[key] = total.get(key, 0) + value
+
+    def close(self):
+        with self.lock:
+            spans = self.spans
+            self.spans = {}
+        for name, total in spans.items():
+            self.record("stage", name, total.pop('seconds'), **total)
+        for name, profile in self.profiles.items():
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile.dump_stats(f"{self.profile_dir}/{name}.pstats")
+            with open(f"{self.profile_dir}/{name}.txt", "w") as _stats:
+                pstats.Stats(profile, stream=_stats).sort_stats('cumulative').print_stats(40)
+        self.profiles = {}
+
+    def summary(self) -> list:
+        totals = {}
+        for entry in self.records:
+            total = totals.setdefault((entry['kind'], entry['name']), {'kind': entry['kind'], 'name': entry['name'], 'calls': 0, 'seconds': 0., 'days': 0, 'files': 0, 'bytes': 0, 'retries': 0})
+            total['calls'] += 1
+            total['seconds'] = round(total['seconds'] + entry['seconds'], 4)
+            for key in ['days', 'files', 'bytes', 'retries']:
+                total[key] += entry.get(key, 0)
+        return list(totals.values())
@@ -0,0 +1,45 @@
+from tqdm import tqdm
+from .instrumentation import StageTimings
+
+
+class ConsoleReport:
+    # Front-ends pass their own report, with the same methods, to show messages and progress their way
+    def __init__(self, verbose: bool = False, timings: StageTimings = None):
+        self.verbose = verbose
+        self.timings = timings if timings is not None else StageTimings()
+
+    def debug(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def info(self, message: str):
+        print(message)
+
+    def error(self, message: str):
+        print(message)
+
+    def progress(self, iterable, total: int):
+        return tqdm(iterable, total=total)
+
+class BufferedReport:
+    # Report of a worker thread: messages are kept, and shown by the main thread with flush, as Streamlit drops the calls made from other threads
+    def __init__(self, report: ConsoleReport):
+        self.timings = report.timings
+        self.messages = []
+
+    def debug(self, message: str):
+        self.messages.append(('debug', message))
+
+    def info(self, message: str):
+        self.messages.append(('info', message))
+
+    def error(self, message: str):
+        self.messages.append(('error', message))
+
+    def progress(self, iterable, total: int):
+        return iterable
+
+    def flush(self, report: ConsoleReport):
+        for level, message in self.messages:
+            getattr(report, level)(message)
+        self.messages = []
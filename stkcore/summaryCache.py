@@ -0,0 +1,57 @@
+import numpy as np
+import hashlib
+import os
+
+cache_dir_name = ".summary"
+summary_columns = {'sigma': np.float64, 'sigma_raw': np.float64, 'pedestal': np.float64, 'cn': np.float64, 'ch5': np.int16, 'ch510': np.int16, 'ch10': np.int16}
+
+
+def getCacheDir(local_cal_dir: str) -> str:
+    return f"{local_cal_dir}/{cache_dir_name}"
+
+def getDirFingerprint(cal_folder: str) -> int:
+    if os.path.isfile(cal_folder):
+        # Archive partition
+        entries = [(os.path.basename(cal_folder), os.stat(cal_folder).st_size, os.stat(cal_folder).st_mtime_ns)]
+    else:
+        entries = sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in os.scandir(cal_folder) if entry.name.endswith('.cal'))
+    digest = hashlib.blake2b(repr(entries).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+def getTreeFingerprint(local_cal_dir: str) -> int:
+    # Day folders (or archive year folders) are rewritten as a whole by the downloader and the archive ingestion, so their mtime tracks their content
+    entries = []
+    if os.path.isdir(local_cal_dir):
+        entries = sorted((entry.name, entry.stat().st_mtime_ns) for entry in os.scandir(local_cal_dir) if entry.name.startswith('20'))
+    digest = hashlib.blake2b(repr(entries).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+def loadSummaryCache(local_cal_dir: str) -> dict:
+    cache_dir = getCacheDir(local_cal_dir)
+    if not os.path.isfile(f"{cache_dir}/date.npy"):
+        return {}
+    dates = np.load(f"{cache_dir}/date.npy").astype(object)
+    fingerprints = np.load(f"{cache_dir}/fingerprint.npy")
+    columns = {column: np.load(f"{cache_dir}/{column}.npy", mmap_mode='r') for column in summary_columns}
+    if any(len(columns[column]) != len(dates) for column in columns) or len(fingerprints) != len(dates):
+        return {}
+    cache = {}
+    for idx, cal_date in enumerate(dates):
+        cache[cal_date] = {'date': cal_date, 'fingerprint': int(fingerprints[idx])}
+        for column in summary_columns:
+            cache[cal_date][column] = columns[column][idx]
+    return cache
+
+def saveSummaryCache(local_cal_dir: str, cache: dict):
+    cache_dir = getCacheDir(local_cal_dir)
+    if not os.path.isdir(cache_dir):
+        os.mkdir(cache_dir)
+    dates = sorted(cache)
+    columns = {'date': np.array(dates, dtype='datetime64[D]'), 'fingerprint': np.array([cache[cal_date]['fingerprint'] for cal_date in dates], dtype=np.int64)}
+    for column in summary_columns:
+        columns[column] = np.array([cache[cal_date][column] for cal_date in dates], dtype=summary_columns[column])
+    for column in columns:
+        np.save(f"{cache_dir}/{column}.tmp.npy", columns[column])
+    # Column files are swapped in only once all of them have been written, date.npy last
+    for column in list(summary_columns) + ['fingerprint', 'date']:
+        os.replace(f"{cache_dir}/{column}.tmp.npy", f"{cache_dir}/{column}.npy")
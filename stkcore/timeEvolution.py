@@ -0,0 +1,103 @@
+from datetime import date
+from bisect import bisect_left, bisect_right
+import numpy as np
+from .report import ConsoleReport
+from .summaryCache import getDirFingerprint, loadSummaryCache, saveSummaryCache
+from .channelCube import cube_variables, cube_day_shape, cube_append_days, loadCubeIndex, openChannelCube, appendCubeDays
+from .calReader import getCalSourceDate, iterCalDays
+from .anomalyIndex import loadStateIndex, appendStateDays, buildTransitionIndex
+
+series_keys = ['date', 'sigma', 'sigma_raw', 'pedestal', 'cn', 'chfrac_s5', 'chfrac_s510', 'chfrac_s10', 'ladders']
+ladder_keys = ['sigma_values', 'sigma_raw_values', 'pedestal_values', 'cn_values', 'chsigmas']
+evolution_keys = series_keys + ladder_keys
+# Per-ladder metrics of the 'ladders' series, from the summary cache columns
+ladder_metrics = {'sigma': 'sigma', 'sigma_raw': 'sigma_raw', 'pedestal': 'pedestal', 'cn': 'cn', 'chfrac_s5': 'ch5', 'chfrac_s510': 'ch510', 'chfrac_s10': 'ch10'}
+trb_shape = (8, 24)
+
+
+def purgeDirs(filelist: list, start_date: date, end_date: date) -> list:
+    # Day folders and archive partitions are date sorted and named YYYYMMDD, so the window is found by bisection
+    days = [cal_dir[cal_dir.rfind('/')+1:cal_dir.rfind('/')+9] for cal_dir in filelist]
+    return filelist[bisect_left(days, start_date.strftime('%Y%m%d')):bisect_right(days, end_date.strftime('%Y%m%d'))]
+
+def getDayLadders(day_summary: dict, nchannels: int = 384) -> np.ndarray:
+    ladders = np.array([day_summary[column] for column in ladder_metrics.values()], dtype=np.float64).reshape((len(ladder_metrics),) + trb_shape)
+    ladders[list(ladder_metrics).index('chfrac_s5'):] /= nchannels
+    return ladders
+
+def getDayValues(day_summary: dict, chsigma: np.ndarray = None, nchannels: int = 384) -> dict:
+    # Tracker values straight from the cached ladder columns: means of the TRB means, and fractions of all the channels
+    ladders = getDayLadders(day_summary, nchannels)
+    means = ladders[:4].mean(axis=2).mean(axis=1)
+    fractions = [np.sum(day_summary[column])/(nchannels*ladders.shape[1]*ladders.shape[2]) for column in ['ch5', 'ch510', 'ch10']]
+    day_values = dict(zip(series_keys, [day_summary['date']] + list(means) + fractions + [ladders]))
+    if chsigma is not None:
+        day_values.update(zip(ladder_keys, [values.ravel().tolist() for values in ladders[:4]] + [chsigma]))
+    return day_values
+
+def iterTimeEvolution(local_cal_dir: str, local_folders: list, report: ConsoleReport, jobs: int = 1, ladder_values: bool = True):
+    # Only days missing from the summary cache, the channel cube or the anomaly index, or whose folder changed since, are parsed again
+    cache = loadSummaryCache(local_cal_dir)
+    cube_index = loadCubeIndex(local_cal_dir)
+    state_index = loadStateIndex(local_cal_dir)
+    stale_folders = {}
+    for cal_folder in local_folders:
+        fingerprint = getDirFingerprint(cal_folder)
+        if cache.get(getCalSourceDate(cal_folder), {}).get('fingerprint') != fingerprint or getCalSourceDate(cal_folder) not in cube_index or getCalSourceDate(cal_folder) not in state_index:
+            stale_folders[cal_folder] = fingerprint
+    report.debug(f"Parsing calibration files... ({len(local_folders)-len(stale_folders)} days read from the summary cache)")
+
+    # Days are yielded one by one, channel sigmas being views on the memory-mapped cube or on the day just parsed
+    new_days = iterCalDays(list(stale_folders), jobs)
+    chsigmas = openChannelCube(local_cal_dir)[:, :, :, cube_variables.index('sigma')]
+    cube_days = {}
+    state_days = {}
+    for cal_folder in report.progress(local_folders, len(local_folders)):
+        cal_date = getCalSourceDate(cal_folder)
+        if cal_folder in stale_folders:
+            with report.timings.span("parse", days=1):
+                day_summary = next(new_days)
+            # A day with missing ladder files (interrupted download) is left out, and parsed again by the next run
+            if len(day_summary['sigma']) != cube_day_shape[0]:
+                report.error(f"Error: {len(day_summary['sigma'])} calibration files in {cal_folder}, {cube_day_shape[0]} expected... day skipped")
+                cache.pop(cal_date, None)
+                continue
+            day_summary['fingerprint'] = stale_folders[cal_folder]
+            cube_days[cal_date] = day_summary.pop('channels')
+            state_days[cal_date] = day_summary.pop('states')
+            cache[cal_date] = day_summary
+            chsigma = cube_days[cal_date][:, :, cube_variables.index('sigma')]
+            if len(cube_days) == cube_append_days:
+                appendCubeDays(local_cal_dir, cube_days)
+                appendStateDays(local_cal_dir, state_days)
+                cube_days = {}
+                state_days = {}
+        else:
+            chsigma = chsigmas[cube_index[cal_date]]
+        yield getDayValues(cache[cal_date], chsigma if ladder_values else None)
+    if len(stale_folders):
+        with report.timings.stage("cache_write", days=len(stale_folders)):
+            appendCubeDays(local_cal_dir, cube_days)
+            appendStateDays(local_cal_dir, state_days)
+            buildTransitionIndex(local_cal_dir)
+            saveSummaryCache(local_cal_dir, cache)
+
+def initEvolutionSeries(keys: list = series_keys) -> dict:
+    return {key: [] for key in keys}
+
+def fillEvolutionSeries(series: dict, day_values: dict):
+    for key in series:
+        series[key].append(day_values[key])
+
+def buildTimeEvolution(local_cal_dir: str, local_folders: list, report: ConsoleReport, jobs: int = 1, ladder_values: bool = True) -> dict:
+    time_evolution = initEvolutionSeries(evolution_keys if ladder_values else series_keys)
+    for day_values in iterTimeEvolution(local_cal_dir, local_folders, report, jobs, ladder_values):
+        fillEvolutionSeries(time_evolution, day_values)
+    return time_evolution
+
+def getLadderArray(time_evolution: dict, metric: str, trbs: list = None, ladders: list = None) -> np.ndarray:
+    # (days x TRB x ladder) slice of a per-ladder metric; ladders are indexed within their TRB
+    if not len(time_evolution['ladders']):
+        return np.empty((0, len(trbs) if trbs else trb_shape[0], len(ladders) if ladders else trb_shape[1]))
+    values = np.stack(time_evolution['ladders'])[:, list(ladder_metrics).index(metric)]
+    return values[np.ix_(range(len(values)), trbs if trbs else range(trb_shape[0]), ladders if ladders else range(trb_shape[1]))]
@@ -0,0 +1,148 @@
+import importlib.util
+import subprocess
+import threading
+import shutil
+import os
+from .report import ConsoleReport
+from .calValidation import getFileChecksum
+
+
+class TransportError(Exception):
+    pass
+
+class CLITransport:
+    # One xrdfs/xrdcp process, and XRootD handshake, per call
+    name = "cli"
+
+    def __init__(self, config: dict):
+        self.farm = config['farmAddress']
+        self.parallel = config.get('xrdcp_parallel', 4)
+
+    def run(self, command: str) -> str:
+        try:
+            return subprocess.run(command, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout.decode('utf-8')
+        except subprocess.CalledProcessError as error:
+            raise TransportError(error.stderr.decode('utf-8').strip()) from error
+
+    def ls(self, remote_dir: str, report: ConsoleReport) -> list:
+        command = f"xrdfs {self.farm} ls {remote_dir}"
+        report.debug(f"Executing XRDFS command: {command}")
+        return str.split(self.run(command).rstrip(), '\n')
+
+    def checksum(self, remote_file: str, report: ConsoleReport) -> str:
+        # "adler32 <hex>", as computed by the server
+        command = f"xrdfs {self.farm} query checksum {remote_file}"
+        report.debug(f"Executing XRDFS command: {command}")
+        return self.run(command).split()[-1].lower()
+
+    def copyFile(self, remote_file: str, local_dir: str, report: ConsoleReport):
+        command = f"xrdcp {self.farm}/{remote_file} {local_dir}"
+        report.debug(f"Downloading file: {command}")
+        self.run(command)
+
+    def copyFiles(self, remote_files: list, local_dir: str, report: ConsoleReport):
+        # A single xrdcp with many sources, copied --parallel at a time over the same connection
+        command = f"xrdcp --force --parallel {self.parallel} {' '.join(f'{self.farm}/{remote_file}' for remote_file in remote_files)} {local_dir}"
+        report.debug(f"Downloading {len(remote_files)} files to {local_dir}")
+        self.run(command)
+
+class XRootDTransport:
+    # In-process client of the XRootD Python bindings: each thread keeps its FileSystem,
+    # and the client multiplexes all of them on one connection to the farm
+    name = "xrootd"
+
+    def __init__(self, config: dict):
+        from XRootD import client
+        self.client = client
+        self.farm = config['farmAddress']
+        self.timeout = config.get('xrootd_timeout', 60)
+        self.parallel = config.get('xrdcp_parallel', 4)
+        self.local = threading.local()
+
+    def getFileSystem(self):
+        if not hasattr(self.local, 'fs'):
+            self.local.fs = self.client.FileSystem(self.farm)
+        return self.local.fs
+
+    def ls(self, remote_dir: str, report: ConsoleReport) -> list:
+        report.debug(f"Listing: {self.farm}{remote_dir}")
+        status, listing = self.getFileSystem().dirlist(remote_dir, timeout=self.timeout)
+        if not status.ok:
+            raise TransportError(f"{remote_dir}: {status.message}")
+        return [f"{remote_dir.rstrip('/')}/{entry.name}" for entry in listing]
+
+    def checksum(self, remote_file: str, report: ConsoleReport) -> str:
+        report.debug(f"Checksum: {self.farm}{remote_file}")
+        status, response = self.getFileSystem().query(self.client.flags.QueryCode.CHECKSUM, remote_file, timeout=self.timeout)
+        if not status.ok:
+            raise TransportError(f"{remote_file}: {status.message}")
+        return response.decode('utf-8').strip('\x00 \n').split()[-1].lower()
+
+    def copy(self, sources: list, targets: list):
+        process = self.client.CopyProcess()
+        process.parallel(self.parallel)
+        for source, target in zip(sources, targets):
+            process.add_job(f"{self.farm}/{source}", target, force=True, mkdir=True)
+        status = process.prepare()
+        if status.ok:
+            status, results = process.run()
+            errors = [result['status'].message for result in results if not result['status'].ok]
+            if status.ok and not len(errors):
+                return
+            raise TransportError("; ".join(errors) if len(errors) else status.message)
+        raise TransportError(status.message)
+
+    def copyFile(self, remote_file: str, local_dir: str, report: ConsoleReport):
+        report.debug(f"Downloading file: {self.farm}/{remote_file}")
+        self.copy([remote_file], [f"{local_dir}/{os.path.basename(remote_file)}"])
+
+    def copyFiles(self, remote_files: list, local_dir: str, report: ConsoleReport):
+        report.debug(f"Downloading {len(remote_files)} files to {local_dir}")
+        self.copy(remote_files, [f"{local_dir}/{os.path.basename(remote_file)}" for remote_file in remote_files])
+
+class LocalTransport:
+    # Remote paths resolved under a local mirror of the farm tree, for tests and benchmarks
+    name = "local"
+
+    def __init__(self, config: dict):
+        self.root = config['local_root']
+
+    def ls(self, remote_dir: str, report: ConsoleReport) -> list:
+        try:
+            with os.scandir(f"{self.root}{remote_dir}") as entries:
+                return [f"{remote_dir.rstrip('/')}/{entry.name}" for entry in entries]
+        except OSError as error:
+            raise TransportError(str(error)) from error
+
+    def checksum(self, remote_file: str, report: ConsoleReport) -> str:
+        try:
+            with open(f"{self.root}{remote_file}", "rb") as _remote:
+                return getFileChecksum(_remote.read())
+        except OSError as error:
+            raise TransportError(str(error)) from error
+
+    def copyFile(self, remote_file: str, local_dir: str, report: ConsoleReport):
+        try:
+            shutil.copy2(f"{self.root}{remote_file}", local_dir)
+        except OSError as error:
+            raise TransportError(str(error)) from error
+
+    def copyFiles(self, remote_files: list, local_dir: str, report: ConsoleReport):
+        for remote_file in remote_files:
+            self.copyFile(remote_file, local_dir, report)
+
+transport_backends = {'xrootd': XRootDTransport, 'cli': CLITransport, 'local': LocalTransport}
+transports = {}
+transports_lock = threading.Lock()
+
+
+def getTransport(config: dict):
+    # Transports are shared by all the calls of the process, so that connections are reused across listings and copies
+    backend = config.get('transport', 'auto')
+    if backend == 'auto':
+        backend = 'xrootd' if importlib.util.find_spec("XRootD") else 'cli'
+    key = (backend, config.get('farmAddress'), config.get('local_root'))
+    with transports_lock:
+        if key not in transports:
+            transports[key] = transport_backends[backend](config)
+        return transports[key]
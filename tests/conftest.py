@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+import numpy as np
+import pytest
+import sys
+import os
+
+# stkcore lives in the repository root, as for the two front-ends
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+nladders = 192
+nchannels = 384
+trailer_rows = "0,0,0\n0,0,0\n0,0,0\n"
+
+
+def writeCalDay(day_dir: str, rng: np.random.Generator, noisy_channels: int = 4):
+    # 192 ladders x 384 channels (ch, va, chva, ped, sigma_raw, sigma, status x3), plus the trailer rows
+    os.makedirs(day_dir, exist_ok=True)
+    channels = np.arange(nchannels)
+    for ladder_idx in range(nladders):
+        ped = rng.normal(221, 20, nchannels)
+        sigma = rng.normal(3, 0.2, nchannels)
+        sigma_raw = np.sqrt(sigma**2 + rng.normal(11, 0.3, nchannels)**2)
+        noisy = rng.choice(nchannels, noisy_channels, replace=False)
+        sigma[noisy] = rng.uniform(5, 15, noisy_channels)
+        status = (sigma > 5).astype(int)
+        rows = np.column_stack((channels, channels//64, channels % 64, ped, sigma_raw, sigma, status, status, status))
+        with open(f"{day_dir}/TRB0{ladder_idx//24}_ladder{ladder_idx:03d}.cal", "w") as _cal:
+            _cal.write("".join("%d,%d,%d,%.3f,%.3f,%.3f,%d,%d,%d\n" % tuple(row) for row in rows) + trailer_rows)
+
+def setCalValue(cal_file: str, channel: int, column: int, value: str):
+    with open(cal_file, "r") as _cal:
+        rows = _cal.read().split('\n')
+    fields = rows[channel].split(',')
+    fields[column] = value
+    rows[channel] = ','.join(fields)
+    with open(cal_file, "w") as _cal:
+        _cal.write('\n'.join(rows))
+
+@pytest.fixture(scope='session')
+def cal_days(tmp_path_factory) -> list:
+    # A small synthetic tree, built once: tests that change it work on a copy (cal_tree)
+    cal_dir = tmp_path_factory.mktemp("source") / "cal"
+    rng = np.random.default_rng(0)
+    start_date = date(2020, 1, 1)
+    for day_idx in range(4):
+        writeCalDay(f"{cal_dir}/{(start_date + timedelta(days=day_idx)).strftime('%Y%m%d')}", rng)
+    return str(cal_dir)
+
+@pytest.fixture
+def cal_tree(cal_days, tmp_path) -> str:
+    import shutil
+    shutil.copytree(cal_days, tmp_path / "cal")
+    return str(tmp_path / "cal")
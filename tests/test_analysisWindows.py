@@ -0,0 +1,29 @@
+from datetime import date
+import pytest
+from stkcore.analysisWindows import parseWindow, getWindows
+from stkcore.calReader import getCalDirList
+
+first_date = date(2020, 1, 1)
+last_date = date(2020, 1, 4)
+
+
+def test_parseWindow():
+    assert parseWindow("20200102:20200103", first_date, last_date) == ("20200102:20200103", date(2020, 1, 2), date(2020, 1, 3))
+    assert parseWindow("early=:20200102", first_date, last_date) == ("early", first_date, date(2020, 1, 2))
+    assert parseWindow("late=20200103:", first_date, last_date) == ("late", date(2020, 1, 3), last_date)
+    assert parseWindow("all=:", first_date, last_date) == ("all", first_date, last_date)
+    assert parseWindow("last2", first_date, last_date) == ("last2", date(2020, 1, 3), last_date)
+
+@pytest.mark.parametrize("window", ["20200101", "last", "lastweek", "last0", "a=20200101:2020", "20200101:20200102:20200103", "20201301:"])
+def test_parseWindow_malformed(window):
+    with pytest.raises(ValueError, match="expected"):
+        parseWindow(window, first_date, last_date)
+
+@pytest.mark.parametrize("window", ["20200103:20200102", "20200105:", ":20191231"])
+def test_parseWindow_reversed(window):
+    with pytest.raises(ValueError, match="before its start"):
+        parseWindow(window, first_date, last_date)
+
+def test_getWindows(cal_days):
+    windows = getWindows(getCalDirList(cal_days), ["last2", "first=:20200101"], "monthly")
+    assert windows == {'last2': (date(2020, 1, 3), last_date), 'first': (first_date, first_date), '2020-01': (first_date, date(2020, 1, 31))}
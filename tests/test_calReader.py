@@ -0,0 +1,48 @@
+import pandas as pd
+import numpy as np
+from stkcore.calReader import buildCalDict, readCalDict, iterCalDays, getCalDirList, nchannels
+
+
+def readLadderLegacy(cal_file: str) -> pd.DataFrame:
+    # The per-ladder reader the block reader replaced: one read_csv per file
+    df = pd.read_csv(cal_file, header=None, nrows=nchannels)
+    df.columns = ["ch", "va", "chva", "ped", "sigma_raw", "sigma", "status", "status_2", "status_3"]
+    return df
+
+def checkLegacyReader(file_cal_dict: dict) -> int:
+    ladder_dicts, all_sigma_values = readCalDict(file_cal_dict)
+    sigma_mean, sigmaraw_mean, ped_mean, cn_mean, ch5, ch5_10, ch10 = ladder_dicts
+    ladder_idx = 0
+    for trb in file_cal_dict:
+        for ladder in file_cal_dict[trb]:
+            df = readLadderLegacy(file_cal_dict[trb][ladder])
+            assert np.isclose(sigma_mean[trb][ladder], df['sigma'].mean())
+            assert np.isclose(sigmaraw_mean[trb][ladder], df['sigma_raw'].mean())
+            assert np.isclose(ped_mean[trb][ladder], df['ped'].mean())
+            assert np.isclose(cn_mean[trb][ladder], np.sqrt(df['sigma_raw'].mean()**2 - df['sigma'].mean()**2))
+            assert ch5[trb][ladder] == len(df.query('sigma<5'))
+            assert ch5_10[trb][ladder] == len(df.query('sigma>=5 & sigma<=10'))
+            assert ch10[trb][ladder] == len(df.query('sigma>10'))
+            assert np.allclose(all_sigma_values[ladder_idx], df['sigma'])
+            ladder_idx += 1
+    return ladder_idx
+
+def test_readCalDict_matches_legacy_reader(cal_days):
+    assert checkLegacyReader(buildCalDict(getCalDirList(cal_days)[0])) == 192
+
+def test_readCalDict_missing_ladder(cal_tree):
+    import os
+    os.remove(f"{cal_tree}/20200101/TRB03_ladder080.cal")
+    file_cal_dict = buildCalDict(getCalDirList(cal_tree)[0])
+    assert [len(file_cal_dict[trb]) for trb in file_cal_dict] == [24, 24, 24, 23, 24, 24, 24, 24]
+    assert checkLegacyReader(file_cal_dict) == 191
+
+def test_iterCalDays_parallel_matches_serial(cal_days):
+    local_folders = getCalDirList(cal_days)
+    serial = list(iterCalDays(local_folders))
+    parallel = list(iterCalDays(local_folders, jobs=2))
+    assert [day['date'] for day in parallel] == [day['date'] for day in serial]
+    for serial_day, parallel_day in zip(serial, parallel):
+        assert serial_day.keys() == parallel_day.keys()
+        for key in serial_day:
+            assert np.array_equal(serial_day[key], parallel_day[key])
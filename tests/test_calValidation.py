@@ -0,0 +1,52 @@
+from stkcore.calValidation import validateCalDay, getFileChecksum
+from conftest import setCalValue
+import zlib
+
+
+def test_valid_day(cal_days):
+    checksums, errors = validateCalDay(f"{cal_days}/20200101")
+    assert errors == []
+    assert len(checksums) == 192
+    with open(f"{cal_days}/20200101/TRB00_ladder000.cal", "rb") as _cal:
+        assert checksums['TRB00_ladder000.cal'] == f"{zlib.adler32(_cal.read()):08x}" == getFileChecksum(open(f"{cal_days}/20200101/TRB00_ladder000.cal", "rb").read())
+
+def test_truncated_file(cal_tree):
+    with open(f"{cal_tree}/20200101/TRB00_ladder000.cal", "r+b") as _cal:
+        _cal.truncate(5000)
+    _, errors = validateCalDay(f"{cal_tree}/20200101")
+    assert errors == ["TRB00_ladder000.cal: truncated last row"]
+
+def test_missing_rows(cal_tree):
+    with open(f"{cal_tree}/20200101/TRB01_ladder024.cal", "r") as _cal:
+        rows = _cal.readlines()
+    with open(f"{cal_tree}/20200101/TRB01_ladder024.cal", "w") as _cal:
+        _cal.writelines(rows[:100])
+    _, errors = validateCalDay(f"{cal_tree}/20200101")
+    assert len(errors) == 1 and errors[0].startswith("TRB01_ladder024.cal: 100 rows")
+
+def test_missing_file(cal_tree):
+    import os
+    os.remove(f"{cal_tree}/20200101/TRB07_ladder191.cal")
+    _, errors = validateCalDay(f"{cal_tree}/20200101")
+    assert errors == ["191 calibration files, 192 expected"]
+
+def test_non_numeric_value(cal_tree):
+    setCalValue(f"{cal_tree}/20200101/TRB02_ladder050.cal", 10, 3, "x221.0")
+    _, errors = validateCalDay(f"{cal_tree}/20200101")
+    assert errors == ["non-numeric channel rows"]
+
+def test_nan_and_out_of_order_values(cal_tree):
+    setCalValue(f"{cal_tree}/20200101/TRB01_ladder030.cal", 5, 3, "nan")
+    setCalValue(f"{cal_tree}/20200101/TRB02_ladder050.cal", 7, 0, "9")
+    setCalValue(f"{cal_tree}/20200101/TRB03_ladder080.cal", 2, 5, "-1.0")
+    _, errors = validateCalDay(f"{cal_tree}/20200101")
+    assert errors == [f"{cal_file}: channel values out of range" for cal_file in ["TRB01_ladder030.cal", "TRB02_ladder050.cal", "TRB03_ladder080.cal"]]
+
+def test_missing_column(cal_tree):
+    with open(f"{cal_tree}/20200101/TRB04_ladder100.cal", "r") as _cal:
+        rows = _cal.read().split('\n')
+    rows[3] = rows[3][:rows[3].rfind(',')]
+    with open(f"{cal_tree}/20200101/TRB04_ladder100.cal", "w") as _cal:
+        _cal.write('\n'.join(rows))
+    _, errors = validateCalDay(f"{cal_tree}/20200101")
+    assert errors == ["TRB04_ladder100.cal: channel rows without 9 columns"]
@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+import threading
+import shutil
+import os
+import pytest
+from stkcore.report import ConsoleReport
+from stkcore.downloadCal import parseXrootDfiles, downloadFiles, checkDownloadedFiles, loadDownloadJournal
+from stkcore.calValidation import validateCalDay
+from conftest import setCalValue
+
+cal_path = "/FM/FlightData/CAL/STK"
+fakexrd_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Console", "fakexrd")
+
+
+def getDays(cal_dir: str) -> list:
+    return sorted(day for day in os.listdir(cal_dir) if day.isdigit())
+
+@pytest.fixture
+def remote_root(cal_days, tmp_path) -> str:
+    # Fake farm tree: the first day has an incomplete RAW_0 and a complete RAW_1, the others one complete RAW_0
+    fake_root = tmp_path / "farm"
+    for day_idx, day in enumerate(getDays(cal_days)):
+        day_dir = f"{fake_root}{cal_path}/{day}"
+        if day_idx == 0:
+            os.makedirs(f"{day_dir}/STK_CALIB_RAW_0")
+            for cal_file in sorted(os.listdir(f"{cal_days}/{day}"))[:96]:
+                shutil.copy(f"{cal_days}/{day}/{cal_file}", f"{day_dir}/STK_CALIB_RAW_0")
+        shutil.copytree(f"{cal_days}/{day}", f"{day_dir}/STK_CALIB_RAW_{int(day_idx == 0)}")
+        with open(f"{day_dir}/STK_CALIB_RAW_{int(day_idx == 0)}/STK_CALIB_RAW.frd", "wb") as _raw:
+            _raw.write(b"\0"*1024)
+    return str(fake_root)
+
+def getConfig(remote_root: str, transport: str) -> dict:
+    return {'farmAddress': "root://localhost//", 'cal_XRDFS_path': cal_path, 'start_date': date(2020, 1, 1), 'end_date': date(2020, 1, 31),
+        'transport': transport, 'local_root': remote_root, 'xrdfs_jobs': 2, 'xrdcp_jobs': 2, 'xrdcp_retries': 0}
+
+@pytest.fixture(params=['local', 'cli'])
+def config(request, remote_root, monkeypatch) -> dict:
+    if request.param == 'cli':
+        monkeypatch.setenv('PATH', f"{fakexrd_dir}{os.pathsep}{os.environ['PATH']}")
+        monkeypatch.setenv('FAKE_XRD_ROOT', remote_root)
+    return getConfig(remote_root, request.param)
+
+def test_parseXrootDfiles(config, tmp_path):
+    file_dict = parseXrootDfiles(config, str(tmp_path), ConsoleReport())
+    assert sorted(file_dict) == [date(2020, 1, 1) + timedelta(days=day_idx) for day_idx in range(4)]
+    assert file_dict[date(2020, 1, 1)] == f"{cal_path}/20200101/STK_CALIB_RAW_1"
+    assert file_dict[date(2020, 1, 2)] == f"{cal_path}/20200102/STK_CALIB_RAW_0"
+    # Days already in the manifest give the same mapping
+    assert parseXrootDfiles(config, str(tmp_path), ConsoleReport()) == file_dict
+
+def test_parseXrootDfiles_earliest_policy(remote_root, tmp_path):
+    file_dict = parseXrootDfiles(dict(getConfig(remote_root, 'local'), raw_policy='earliest'), str(tmp_path), ConsoleReport())
+    assert file_dict[date(2020, 1, 1)] == f"{cal_path}/20200101/STK_CALIB_RAW_1"
+    shutil.copytree(f"{remote_root}{cal_path}/20200102/STK_CALIB_RAW_0", f"{remote_root}{cal_path}/20200102/STK_CALIB_RAW_1")
+    file_dict = parseXrootDfiles(dict(getConfig(remote_root, 'local'), raw_policy='earliest'), str(tmp_path), ConsoleReport())
+    assert file_dict[date(2020, 1, 2)] == f"{cal_path}/20200102/STK_CALIB_RAW_0"
+
+def test_parseXrootDfiles_unknown_policy(remote_root, tmp_path):
+    with pytest.raises(ValueError, match="raw_policy"):
+        parseXrootDfiles(dict(getConfig(remote_root, 'local'), raw_policy='all'), str(tmp_path), ConsoleReport())
+
+def test_downloadFiles(config, cal_days, tmp_path, capsys):
+    local_dir = str(tmp_path / "cal")
+    os.makedirs(local_dir)
+    file_dict = parseXrootDfiles(config, local_dir, ConsoleReport())
+    assert downloadFiles(file_dict, local_dir, config, ConsoleReport())
+    assert checkDownloadedFiles(local_dir, ConsoleReport())
+    for day in getDays(cal_days):
+        assert sorted(os.listdir(f"{local_dir}/{day}")) == sorted(os.listdir(f"{cal_days}/{day}"))
+        assert loadDownloadJournal(local_dir)[day]['checksums'] == validateCalDay(f"{cal_days}/{day}")[0]
+    assert not os.path.exists(f"{local_dir}/.staging")
+
+    # Nothing left to download on the second run
+    capsys.readouterr()
+    assert downloadFiles(file_dict, local_dir, config, ConsoleReport())
+    assert "4 calibration days already downloaded" in capsys.readouterr().out
+
+def test_downloadFiles_republished_day(remote_root, tmp_path):
+    config = getConfig(remote_root, 'local')
+    local_dir = str(tmp_path / "cal")
+    os.makedirs(local_dir)
+    assert downloadFiles(parseXrootDfiles(config, local_dir, ConsoleReport()), local_dir, config, ConsoleReport())
+    # A new RAW folder with a single changed file only costs that file
+    raw_dir = f"{remote_root}{cal_path}/20200103/STK_CALIB_RAW_1"
+    shutil.copytree(f"{remote_root}{cal_path}/20200103/STK_CALIB_RAW_0", raw_dir)
+    setCalValue(f"{raw_dir}/TRB00_ladder000.cal", 0, 3, "999.999")
+    assert downloadFiles(parseXrootDfiles(config, local_dir, ConsoleReport()), local_dir, config, ConsoleReport())
+    entry = loadDownloadJournal(local_dir)['20200103']
+    assert entry['remote_dir'] == f"{cal_path}/20200103/STK_CALIB_RAW_1"
+    assert entry['files'] == 1
+    with open(f"{local_dir}/20200103/TRB00_ladder000.cal", "r") as _cal:
+        assert _cal.readline().split(',')[3] == "999.999"
+
+class MainThreadReport(ConsoleReport):
+    # Like the Streamlit report, whose messages are lost when sent from a worker thread
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def debug(self, message: str):
+        assert threading.current_thread() is threading.main_thread()
+        self.messages.append(message)
+
+    def info(self, message: str):
+        assert threading.current_thread() is threading.main_thread()
+        self.messages.append(message)
+
+    def error(self, message: str):
+        assert threading.current_thread() is threading.main_thread()
+        self.messages.append(message)
+
+def test_downloadFiles_invalid_remote_day(remote_root, tmp_path):
+    config = dict(getConfig(remote_root, 'local'), xrdcp_retries=1, xrdcp_backoff=0.)
+    local_dir = str(tmp_path / "cal")
+    os.makedirs(local_dir)
+    with open(f"{remote_root}{cal_path}/20200104/STK_CALIB_RAW_0/TRB05_ladder120.cal", "r+b") as _cal:
+        _cal.truncate(1000)
+    report = MainThreadReport()
+    assert not downloadFiles(parseXrootDfiles(config, local_dir, ConsoleReport()), local_dir, config, report)
+    assert [message for message in report.messages if "TRB05_ladder120.cal: truncated last row" in message] == [
+        f"Error: invalid calibration downloaded from {cal_path}/20200104/STK_CALIB_RAW_0 (attempt {attempt}/2): TRB05_ladder120.cal: truncated last row" for attempt in [1, 2]]
+    assert getDays(local_dir) == ["20200101", "20200102", "20200103"]
+    assert '20200104' not in loadDownloadJournal(local_dir)
+
+def test_downloadFiles_invalid_local_day(remote_root, tmp_path):
+    config = getConfig(remote_root, 'local')
+    local_dir = str(tmp_path / "cal")
+    os.makedirs(local_dir)
+    file_dict = parseXrootDfiles(config, local_dir, ConsoleReport())
+    assert downloadFiles(file_dict, local_dir, config, ConsoleReport())
+    # A complete day without checksums in the journal, as downloaded by older versions, is validated in place
+    os.remove(f"{local_dir}/.download_journal")
+    setCalValue(f"{local_dir}/20200102/TRB01_ladder030.cal", 5, 3, "nan")
+    report = MainThreadReport()
+    assert downloadFiles(file_dict, local_dir, config, report)
+    assert "Invalid calibration in 20200102: TRB01_ladder030.cal: channel values out of range... downloading it again" in report.messages
+    journal = loadDownloadJournal(local_dir)
+    assert {day: entry['files'] for day, entry in journal.items()} == {'20200101': 0, '20200102': 192, '20200103': 0, '20200104': 0}
+    assert all(sorted(entry) == ['bytes', 'checksums', 'date', 'files', 'remote_dir'] for entry in journal.values())
+    assert validateCalDay(f"{local_dir}/20200102")[1] == []
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+import numpy as np
+from stkcore.driftMonitor import initDriftMonitor, fillDriftMonitor, finalizeDriftMonitor, loadDriftAlerts
+
+settings = {'window': 10, 'min_days': 5, 'z_threshold': 5., 'cusum_drift': 0.5, 'cusum_threshold': 10.}
+
+
+def getDayValues(cal_date: date, rng: np.random.Generator, shift: float = 0.) -> dict:
+    sigma = rng.normal(3, 0.01, 192)
+    sigma[42] += shift
+    return {'date': cal_date, 'sigma_values': sigma, 'pedestal_values': rng.normal(221, 0.1, 192), 'cn_values': rng.normal(11, 0.01, 192)}
+
+def test_alerts_stored_and_reloaded(tmp_path):
+    rng = np.random.default_rng(0)
+    monitor = initDriftMonitor(str(tmp_path), settings)
+    for day_idx in range(12):
+        fillDriftMonitor(monitor, getDayValues(date(2020, 1, 1) + timedelta(days=day_idx), rng, 1. if day_idx == 11 else 0.))
+    alerts = finalizeDriftMonitor(monitor)
+    assert {(alert['date'], alert['kind'], alert['variable'], alert['trb'], alert['ladder']) for alert in alerts if alert['ladder_idx'] == 42} == {('20200112', 'deviation', 'sigma', 1, 18), ('20200112', 'change_point', 'sigma', 1, 18)}
+    assert loadDriftAlerts(str(tmp_path)) == alerts
+
+    # Days already monitored are skipped by the next run, new ones appended
+    monitor = initDriftMonitor(str(tmp_path), settings)
+    fillDriftMonitor(monitor, getDayValues(date(2020, 1, 12), rng, 1.))
+    assert finalizeDriftMonitor(monitor) == []
+    fillDriftMonitor(monitor, getDayValues(date(2020, 1, 13), rng, 3.))
+    new_alerts = finalizeDriftMonitor(monitor)
+    assert monitor['new_days'] == 1 and len(new_alerts)
+    assert loadDriftAlerts(str(tmp_path)) == alerts + new_alerts
+
+def test_no_alerts(tmp_path):
+    assert loadDriftAlerts(str(tmp_path)) == []
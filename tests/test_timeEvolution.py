@@ -0,0 +1,101 @@
+from datetime import date
+import numpy as np
+from stkcore.report import ConsoleReport
+from stkcore.calReader import getCalDirList
+from stkcore.calIndex import getIndexedDays
+from stkcore.timeEvolution import purgeDirs, buildTimeEvolution
+from conftest import setCalValue
+
+
+def test_cache_and_cube_invalidated_by_changed_day(cal_tree):
+    local_folders = getCalDirList(cal_tree)
+    first = buildTimeEvolution(cal_tree, local_folders, ConsoleReport())
+    cached = buildTimeEvolution(cal_tree, local_folders, ConsoleReport())
+    assert np.allclose(first['sigma'], cached['sigma'])
+    assert np.allclose(np.stack(first['chsigmas']), np.stack(cached['chsigmas']))
+
+    # Same file size, only the content (and mtime) changes
+    setCalValue(f"{cal_tree}/20200102/TRB03_ladder072.cal", 100, 5, "99.999")
+    updated = buildTimeEvolution(cal_tree, local_folders, ConsoleReport())
+    assert updated['sigma'][1] > first['sigma'][1]
+    assert np.isclose(updated['chsigmas'][1][72, 100], 99.999)
+    assert updated['chfrac_s10'][1] == first['chfrac_s10'][1] + (first['chsigmas'][1][72, 100] <= 10)/(384*192)
+    for day_idx in [0, 2, 3]:
+        assert updated['sigma'][day_idx] == first['sigma'][day_idx]
+        assert np.array_equal(updated['chsigmas'][day_idx], first['chsigmas'][day_idx])
+
+def test_cache_invalidated_by_missing_ladder(cal_tree):
+    import os
+    local_folders = getCalDirList(cal_tree)
+    first = buildTimeEvolution(cal_tree, local_folders, ConsoleReport(), ladder_values=False)
+    os.rename(f"{cal_tree}/20200103/TRB07_ladder191.cal", f"{cal_tree}/TRB07_ladder191.cal")
+    assert len(os.listdir(f"{cal_tree}/20200103")) == 191
+    os.rename(f"{cal_tree}/TRB07_ladder191.cal", f"{cal_tree}/20200103/TRB07_ladder191.cal")
+    setCalValue(f"{cal_tree}/20200103/TRB07_ladder191.cal", 0, 3, "0.000")
+    updated = buildTimeEvolution(cal_tree, local_folders, ConsoleReport(), ladder_values=False)
+    assert updated['pedestal'][2] < first['pedestal'][2]
+
+def test_purgeDirs_matches_linear_scan(cal_tree):
+    local_folders = getCalDirList(cal_tree)
+    for start, end in [(date(2019, 12, 1), date(2020, 1, 2)), (date(2020, 1, 2), date(2020, 1, 2)), (date(2020, 1, 3), date(2021, 1, 1)), (date(2020, 1, 5), date(2020, 2, 1)), (date(2020, 1, 3), date(2020, 1, 1))]:
+        expected = [cal_dir for cal_dir in local_folders if start.strftime('%Y%m%d') <= cal_dir[-8:] <= end.strftime('%Y%m%d')]
+        assert purgeDirs(local_folders, start, end) == expected
+        assert getIndexedDays(cal_tree, start, end) == expected
+    assert getIndexedDays(cal_tree) == local_folders
+
+def test_indexed_days_follow_tree_changes(cal_tree):
+    import shutil
+    assert len(getIndexedDays(cal_tree)) == 4
+    shutil.copytree(f"{cal_tree}/20200101", f"{cal_tree}/20200110")
+    shutil.rmtree(f"{cal_tree}/20200102")
+    assert getIndexedDays(cal_tree, date(2020, 1, 2)) == [f"{cal_tree}/{day}" for day in ["20200103", "20200104", "20200110"]]
+
+def test_day_values_match_per_trb_reference(cal_tree):
+    from stkcore.summaryCache import loadSummaryCache
+    from stkcore.timeEvolution import getDayValues
+    buildTimeEvolution(cal_tree, getCalDirList(cal_tree), ConsoleReport(), ladder_values=False)
+    for day_summary in loadSummaryCache(cal_tree).values():
+        day_values = getDayValues(day_summary, np.zeros((192, 384), dtype=np.float32))
+        for key, column in [('sigma', 'sigma'), ('sigma_raw', 'sigma_raw'), ('pedestal', 'pedestal'), ('cn', 'cn')]:
+            assert day_values[key] == np.mean([np.mean(list(trb_values)) for trb_values in np.reshape(day_summary[column], (8, 24)).tolist()])
+            assert day_values[f"{key}_values"] == list(np.asarray(day_summary[column], dtype=np.float64))
+        for key, column in [('chfrac_s5', 'ch5'), ('chfrac_s510', 'ch510'), ('chfrac_s10', 'ch10')]:
+            assert day_values[key] == sum(int(ncount) for ncount in day_summary[column])/(384*192)
+        assert day_values['chfrac_s5'] + day_values['chfrac_s510'] + day_values['chfrac_s10'] == 1
+
+class RecordingReport(ConsoleReport):
+    def __init__(self):
+        super().__init__()
+        self.errors = []
+
+    def error(self, message: str):
+        self.errors.append(message)
+
+def test_day_with_missing_ladder_skipped(cal_tree):
+    import os
+    local_folders = getCalDirList(cal_tree)
+    complete = buildTimeEvolution(cal_tree, local_folders, ConsoleReport())
+    os.rename(f"{cal_tree}/20200102/TRB07_ladder191.cal", f"{cal_tree}/TRB07_ladder191.cal")
+    for jobs in [1, 2]:
+        report = RecordingReport()
+        partial = buildTimeEvolution(cal_tree, getCalDirList(cal_tree), report, jobs)
+        assert partial['date'] == [complete['date'][day_idx] for day_idx in [0, 2, 3]]
+        assert partial['sigma'] == [complete['sigma'][day_idx] for day_idx in [0, 2, 3]]
+        assert report.errors == [f"Error: 191 calibration files in {cal_tree}/20200102, 192 expected... day skipped"]
+    # Back once the missing file is downloaded
+    os.rename(f"{cal_tree}/TRB07_ladder191.cal", f"{cal_tree}/20200102/TRB07_ladder191.cal")
+    restored = buildTimeEvolution(cal_tree, getCalDirList(cal_tree), ConsoleReport())
+    assert restored['sigma'] == complete['sigma']
+    assert all(np.array_equal(restored_sigma, complete_sigma) for restored_sigma, complete_sigma in zip(restored['chsigmas'], complete['chsigmas']))
+
+def test_day_with_missing_ladder_not_archived(cal_tree, tmp_path):
+    import os
+    from stkcore.calReader import ingestCalArchive
+    from stkcore.calArchive import getArchiveDays
+    os.remove(f"{cal_tree}/20200103/TRB00_ladder000.cal")
+    report = RecordingReport()
+    assert ingestCalArchive(getCalDirList(cal_tree), str(tmp_path / "archive"), report)
+    assert report.errors == [f"Error: 191 calibration files in {cal_tree}/20200103, 192 expected... day not archived"]
+    assert [archive_day[-12:-4] for archive_day in getArchiveDays(str(tmp_path / "archive"))] == ["20200101", "20200102", "20200104"]
+    partial = buildTimeEvolution(str(tmp_path / "archive"), getArchiveDays(str(tmp_path / "archive")), ConsoleReport())
+    assert len(partial['date']) == 3
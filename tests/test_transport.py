@@ -0,0 +1,111 @@
+from types import ModuleType, SimpleNamespace
+import zlib
+import sys
+import os
+import pytest
+from stkcore.report import ConsoleReport
+from stkcore.transport import XRootDTransport, TransportError
+
+
+class XRootDStatus:
+    def __init__(self, message: str = ""):
+        self.ok = not message
+        self.message = message
+
+class FileSystem:
+    # Stand-in for XRootD.client.FileSystem, serving the tree under FileSystem.root
+    root = ""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def dirlist(self, path: str, flags: int = 0, timeout: int = 0) -> tuple:
+        if not os.path.isdir(f"{self.root}{path}"):
+            return (XRootDStatus(f"[ERROR] Server responded with an error: [3011] Unable to open directory {path}"), None)
+        return (XRootDStatus(), [SimpleNamespace(name=name) for name in sorted(os.listdir(f"{self.root}{path}"))])
+
+    def query(self, querycode: int, arg: str, timeout: int = 0) -> tuple:
+        assert querycode == QueryCode.CHECKSUM
+        if not os.path.isfile(f"{self.root}{arg}"):
+            return (XRootDStatus(f"[ERROR] Server responded with an error: [3011] No such file or directory: {arg}"), None)
+        with open(f"{self.root}{arg}", "rb") as _file:
+            return (XRootDStatus(), f"adler32 {zlib.adler32(_file.read()):08x}\x00".encode('utf-8'))
+
+class CopyProcess:
+    # Same keyword arguments as XRootD.client.CopyProcess.add_job, so that a misspelt one fails as it would on the farm
+    def __init__(self):
+        self.jobs = []
+        self.nparallel = 1
+
+    def parallel(self, n: int):
+        self.nparallel = n
+
+    def add_job(self, source: str, target: str, sourcelimit: int = 1, force: bool = False, posc: bool = False, coerce: bool = False, mkdir: bool = False, thirdparty: str = 'none', checksummode: str = 'none'):
+        self.jobs.append((source, target, force, mkdir))
+
+    def prepare(self) -> XRootDStatus:
+        return XRootDStatus() if len(self.jobs) else XRootDStatus("no copy jobs")
+
+    def run(self) -> tuple:
+        results = []
+        for source, target, force, mkdir in self.jobs:
+            local_source = f"{FileSystem.root}{source[source.find('//', source.find('//')+2)+1:]}"
+            if not os.path.isfile(local_source):
+                results.append({'status': XRootDStatus(f"[ERROR] Server responded with an error: [3011] No such file or directory: {source}")})
+            elif os.path.exists(target) and not force:
+                results.append({'status': XRootDStatus(f"[ERROR] Local error: file exists: {target}")})
+            elif not os.path.isdir(os.path.dirname(target)) and not mkdir:
+                results.append({'status': XRootDStatus(f"[ERROR] Local error: no such directory: {os.path.dirname(target)}")})
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(local_source, "rb") as _source, open(target, "wb") as _target:
+                    _target.write(_source.read())
+                results.append({'status': XRootDStatus()})
+        return (XRootDStatus(), results)
+
+QueryCode = SimpleNamespace(CHECKSUM=3)
+
+
+@pytest.fixture
+def transport(tmp_path, monkeypatch) -> XRootDTransport:
+    client = ModuleType("XRootD.client")
+    client.FileSystem = FileSystem
+    client.CopyProcess = CopyProcess
+    client.flags = SimpleNamespace(QueryCode=QueryCode)
+    xrootd = ModuleType("XRootD")
+    xrootd.client = client
+    monkeypatch.setitem(sys.modules, "XRootD", xrootd)
+    monkeypatch.setitem(sys.modules, "XRootD.client", client)
+    monkeypatch.setattr(FileSystem, "root", str(tmp_path / "farm"))
+    os.makedirs(tmp_path / "farm/FM/CAL/20200101")
+    for ladder_idx in range(3):
+        with open(tmp_path / f"farm/FM/CAL/20200101/TRB00_ladder{ladder_idx:03d}.cal", "wb") as _cal:
+            _cal.write(f"{ladder_idx},0,0\n".encode('utf-8'))
+    return XRootDTransport({'farmAddress': "root://localhost//", 'xrdcp_parallel': 2})
+
+def test_ls(transport):
+    assert transport.ls("/FM/CAL/", ConsoleReport()) == ["/FM/CAL/20200101"]
+    with pytest.raises(TransportError, match="Unable to open directory"):
+        transport.ls("/FM/MISSING", ConsoleReport())
+
+def test_checksum(transport):
+    with open(f"{FileSystem.root}/FM/CAL/20200101/TRB00_ladder001.cal", "rb") as _cal:
+        assert transport.checksum("/FM/CAL/20200101/TRB00_ladder001.cal", ConsoleReport()) == f"{zlib.adler32(_cal.read()):08x}"
+    with pytest.raises(TransportError, match="No such file"):
+        transport.checksum("/FM/CAL/20200101/TRB00_ladder009.cal", ConsoleReport())
+
+def test_copyFiles(transport, tmp_path):
+    # The day folder does not exist yet: the copy creates it
+    remote_files = [f"/FM/CAL/20200101/TRB00_ladder{ladder_idx:03d}.cal" for ladder_idx in range(3)]
+    transport.copyFiles(remote_files, str(tmp_path / "local/20200101"), ConsoleReport())
+    assert sorted(os.listdir(tmp_path / "local/20200101")) == [os.path.basename(remote_file) for remote_file in remote_files]
+    # Files already there are overwritten
+    transport.copyFile(remote_files[0], str(tmp_path / "local/20200101"), ConsoleReport())
+    with open(tmp_path / "local/20200101/TRB00_ladder000.cal", "rb") as _cal:
+        assert _cal.read() == b"0,0,0\n"
+
+def test_copy_errors(transport, tmp_path):
+    with pytest.raises(TransportError, match="TRB00_ladder009.cal"):
+        transport.copyFiles(["/FM/CAL/20200101/TRB00_ladder000.cal", "/FM/CAL/20200101/TRB00_ladder009.cal"], str(tmp_path / "local"), ConsoleReport())
+    with pytest.raises(TransportError, match="no copy jobs"):
+        transport.copyFiles([], str(tmp_path / "local"), ConsoleReport())